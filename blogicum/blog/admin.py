@@ -1,41 +1,65 @@
 from django.contrib import admin
 from .models import Post, Location, Category, Comment, User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .search import filter_matching
+from .writes import run_write
 
 admin.site.unregister(User)
 
 
+class RetryWritesAdminMixin:
+    """Mixin retrying admin saves and deletes while SQLite is locked."""
+
+    def changeform_view(self, request, *args, **kwargs):
+        view = super().changeform_view
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        return run_write(lambda: view(request, *args, **kwargs))
+
+    def delete_view(self, request, *args, **kwargs):
+        view = super().delete_view
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        return run_write(lambda: view(request, *args, **kwargs))
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(RetryWritesAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'pub_date', 'is_published')
     search_fields = ('title', 'text')
     list_filter = ('is_published', 'pub_date', 'category')
     ordering = ('-pub_date',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Search the full-text index instead of LIKE scans of search_fields
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
 
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(RetryWritesAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'is_published', 'created_at')
     search_fields = ('name',)
     list_filter = ('is_published',)
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(RetryWritesAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'slug', 'is_published', 'created_at')
     search_fields = ('title', 'slug')
     list_filter = ('is_published',)
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(RetryWritesAdminMixin, admin.ModelAdmin):
     list_display = ('post', 'author', 'text', 'created_at')
     search_fields = ('post__title', 'author__username', 'text')
     list_filter = ('created_at',)
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(RetryWritesAdminMixin, BaseUserAdmin):
     """Admin panel configuration for the User model."""
 
     fieldsets = (
@@ -5,3 +5,16 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .cache import create_cache_table
+        from .search import install_search_triggers
+        from .sqlite import apply_pragmas
+
+        connection_created.connect(apply_pragmas)
+        post_migrate.connect(install_search_triggers, sender=self)
+        post_migrate.connect(create_cache_table, sender=self)
@@ -0,0 +1,343 @@
+import math
+import random
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, quote_etag
+from django.utils import translation
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+
+from .holes import fill_holes
+from .middleware import render_response
+from .models import Post
+from .routers import primary_reads
+from .visibility import PostVisibility
+
+PAGE_CACHE_GENERATION_KEY = 'page_cache:generation'
+POST_CARD_HITS_KEY = 'post_card:hits'
+POST_CARD_MISSES_KEY = 'post_card:misses'
+# Stored instead of a post to remember that the id does not exist
+MISSING_POST = 'missing'
+
+
+def get_or_compute(key, compute, timeout, should_cache=None, beta=1.0):
+    """
+    Return the cached value of ``key`` computing it with stampede protection.
+
+    * single flight: only the worker holding ``<key>:lock`` recomputes an
+      expired entry, the others keep serving the stale value, which is
+      kept for CACHE_STALE_TIMEOUT seconds past its expiry;
+    * early refresh: an entry is recomputed before it expires with a
+      probability growing as the expiry nears and with the time the last
+      computation took (the "XFetch" algorithm, tuned by ``beta``);
+    * when there is no value to serve, workers wait for the lock holder for
+      at most CACHE_LOCK_TIMEOUT seconds, or until it releases the lock
+      without storing a value, and then compute directly.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        gap = delta * beta * math.log(1.0 - random.random())
+        if time.time() - gap < expires_at:
+            return value
+
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            return _compute_and_store(key, compute, timeout, should_cache)
+        finally:
+            cache.delete(lock_key)
+    if entry is not None:
+        return value
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entries = cache.get_many([key, lock_key])
+        if key in entries:
+            return entries[key][0]
+        if lock_key not in entries:
+            # The lock holder is done but stored nothing, see should_cache
+            break
+    # The lock holder is stuck or gone, don't keep the request waiting
+    return compute()
+
+
+def _compute_and_store(key, compute, timeout, should_cache):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    if should_cache is None or should_cache(value):
+        cache.set(
+            key, (value, delta, time.time() + timeout),
+            timeout + settings.CACHE_STALE_TIMEOUT
+        )
+    return value
+
+
+def create_cache_table(using, **kwargs):
+    """
+    Create the table of the database cache with ``migrate``.
+
+    Both migrating the primary and the cache database create it, in the
+    cache database. A flush, which keeps the table, sends no ``plan``.
+    """
+    if 'plan' in kwargs and using in (
+        DEFAULT_DB_ALIAS, settings.CACHE_DATABASE
+    ):
+        call_command(
+            'createcachetable', database=settings.CACHE_DATABASE,
+            verbosity=0
+        )
+
+
+def get_page_cache_generation():
+    generation = cache.get(PAGE_CACHE_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(PAGE_CACHE_GENERATION_KEY, generation, None)
+        generation = cache.get(PAGE_CACHE_GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_page_cache():
+    """Drop every cached page by moving to a new cache generation."""
+    cache.set(PAGE_CACHE_GENERATION_KEY, time.time_ns(), None)
+
+
+def get_page_cache_key(request):
+    path = md5(request.get_full_path().encode()).hexdigest()
+    return f'page_cache:{get_page_cache_generation()}:{request.method}:{path}'
+
+
+def not_modified_response(request, response):
+    """Answer a conditional request from the validators of ``response``."""
+    if response.status_code != 200:
+        return response
+    last_modified = response.get('Last-Modified')
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response,
+    )
+
+
+def fill_page_holes(request, response):
+    """Fill the holes of a shared page for the current user."""
+    if response.status_code != 200:
+        return response
+    response.content = fill_holes(
+        request, response.content.decode(response.charset)
+    )
+    etag = response.get('ETag')
+    if etag and request.user.is_authenticated:
+        response['ETag'] = quote_etag(
+            md5(f'{etag}:{request.user.pk}'.encode()).hexdigest()
+        )
+    return response
+
+
+class SharedPageCacheMixin:
+    """
+    Mixin caching whole pages once for all users ("donut" caching).
+
+    A page is rendered as for an anonymous visitor, with the user-specific
+    parts left as holes (see blog.holes), and every GET request gets the
+    cached page with its holes filled in. Authenticated users share it when
+    ``is_page_shared`` says they would see the same page body.
+
+    Pages are keyed on the path and query string and are dropped as soon as
+    a post, category, location or comment changes (see blog.signals). Posts
+    scheduled for the future appear after at most PAGE_CACHE_TIMEOUT.
+    Conditional requests are answered from the validators of the cached
+    page.
+    """
+
+    page_cache_timeout = None
+
+    def get_page_cache_timeout(self):
+        if self.page_cache_timeout is None:
+            return settings.PAGE_CACHE_TIMEOUT
+        return self.page_cache_timeout
+
+    def is_page_shared(self, request):
+        """Whether the authenticated user sees the anonymous page body."""
+        return False
+
+    def is_page_cacheable(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and self.get_page_cache_timeout() > 0
+            and (
+                not request.user.is_authenticated
+                or self.is_page_shared(request)
+            )
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        response = get_or_compute(
+            get_page_cache_key(request),
+            lambda: self.render_page(request, *args, **kwargs),
+            self.get_page_cache_timeout(),
+            should_cache=lambda response: (
+                response.status_code == 200 and not response.cookies
+            ),
+        )
+        return not_modified_response(
+            request, fill_page_holes(request, response)
+        )
+
+    def render_page(self, request, *args, **kwargs):
+        user = request.user
+        request.user, request.punch_holes = AnonymousUser(), True
+        try:
+            # Served to everyone until invalidated, so not from a replica
+            with primary_reads():
+                response = super().dispatch(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    render_response(request, response)
+        finally:
+            request.user, request.punch_holes = user, False
+        return response
+
+
+def user_has_hidden_posts(user):
+    """
+    Whether the user has posts only they can see.
+
+    Cached per page cache generation: a post only becomes hidden when it is
+    saved, which moves the generation.
+    """
+    key = f'hidden_posts:{get_page_cache_generation()}:{user.pk}'
+    hidden = cache.get(key)
+    if hidden is None:
+        with primary_reads():
+            hidden = PostVisibility(
+                Post.objects.all(), user
+            ).hidden().exists()
+        cache.set(key, hidden, settings.PAGE_CACHE_TIMEOUT)
+    return hidden
+
+
+def post_card_version(post):
+    """
+    Version of a rendered post card.
+
+    The version is a digest of everything post_card.html shows, so it
+    changes whenever the post is saved with new content, its category,
+    location or author changes, its comment counter moves or the renditions
+    of its image are ready.
+    """
+    category, location = post.category, post.location
+    parts = (
+        post.title, post.excerpt, post.pub_date.isoformat(), post.is_published,
+        post.image.name, post.image_renditions.get('name'),
+        post.comment_count, post.author.username,
+        category and (category.slug, category.title, category.is_published),
+        location and (location.name, location.is_published),
+        translation.get_language(),
+    )
+    return md5(repr(parts).encode()).hexdigest()
+
+
+def get_post_card_key(post):
+    return f'post_card:{post.pk}:{post_card_version(post)}'
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def get_post_card_stats():
+    """Hit and miss counters of the post card cache."""
+    stats = cache.get_many([POST_CARD_HITS_KEY, POST_CARD_MISSES_KEY])
+    hits = stats.get(POST_CARD_HITS_KEY, 0)
+    misses = stats.get(POST_CARD_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_post_card_stats():
+    cache.delete_many([POST_CARD_HITS_KEY, POST_CARD_MISSES_KEY])
+
+
+def render_post_cards(posts):
+    """
+    Render a page of post cards, reusing cached fragments.
+
+    All cards of the page are fetched with a single multi-get; only the
+    missing ones are rendered and stored back.
+    """
+    keys = {get_post_card_key(post): post for post in posts}
+    fragments = cache.get_many(keys)
+    missing = {
+        key: render_to_string('includes/post_card.html', {'post': post})
+        for key, post in keys.items() if key not in fragments
+    }
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        fragments.update(missing)
+    _count(POST_CARD_HITS_KEY, len(keys) - len(missing))
+    _count(POST_CARD_MISSES_KEY, len(missing))
+    return format_html_join(
+        '\n', '<article class="mb-5">{}</article>',
+        ((mark_safe(fragments[key]),) for key in keys)
+    )
+
+
+def get_post_cache_key(post_id):
+    return f'post:{post_id}'
+
+
+def get_cached_post(post_id):
+    """
+    Read-through cache of a post with its category, location and author.
+
+    Missing ids are cached too, for POST_NEGATIVE_CACHE_TIMEOUT seconds,
+    so floods of requests for unknown posts don't reach the database.
+    Returns None for a missing post.
+    """
+    key = get_post_cache_key(post_id)
+    post = cache.get(key)
+    if post is None:
+        with primary_reads():
+            post = Post.objects.select_related(
+                'author', 'category', 'location'
+            ).defer('author__password').filter(pk=post_id).first()
+        if post is None:
+            cache.set(key, MISSING_POST, settings.POST_NEGATIVE_CACHE_TIMEOUT)
+        else:
+            cache.set(key, post, settings.POST_CACHE_TIMEOUT)
+    return None if post == MISSING_POST else post
+
+
+def invalidate_cached_posts(post_ids):
+    post_ids = list(post_ids)
+    # A single multi-delete would be a query with a parameter per key
+    for start in range(0, len(post_ids), 500):
+        cache.delete_many([
+            get_post_cache_key(post_id)
+            for post_id in post_ids[start:start + 500]
+        ])
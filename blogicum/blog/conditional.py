@@ -0,0 +1,62 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_page_cache_generation
+
+
+class ConditionalGetMixin:
+    """
+    Mixin answering ``If-None-Match``/``If-Modified-Since`` with 304.
+
+    ``get_validators()`` returns the parts the page depends on and the time
+    of its last change, computed with cheap queries and without rendering.
+    The time is None when it would miss some changes of the page; then
+    only the ETag validates it.
+    The ETag is a digest of those parts, the page cache generation (moved
+    by every post, category, location and comment change), the user and
+    the full path. A 304 is returned before the page is rendered.
+    """
+
+    def get_validators(self):
+        """
+        Return ``(parts, last_modified)`` of the current page.
+
+        Either is None to leave out its validator; by default both are.
+        """
+        return None, None
+
+    def get_etag(self, parts):
+        user = self.request.user
+        key = repr((
+            parts, get_page_cache_generation(),
+            user.pk if user.is_authenticated else None,
+            self.request.get_full_path(),
+        ))
+        return quote_etag(md5(key.encode()).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        parts, last_modified = self.get_validators()
+        etag = None if parts is None else self.get_etag(parts)
+        if last_modified is not None:
+            # The author's own scheduled posts may lie in the future
+            last_modified = timegm(
+                min(last_modified, timezone.now()).utctimetuple()
+            )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        if etag:
+            response.setdefault('ETag', etag)
+        if last_modified:
+            response.setdefault('Last-Modified', http_date(last_modified))
+        return response
@@ -0,0 +1,78 @@
+"""
+Holes: the user-specific parts of otherwise shared pages.
+
+``{% hole "name" arg ... %}`` renders the registered fragment in place. While
+a page is rendered for the shared page cache, it leaves a
+``<!--hole:name:arg...-->`` marker instead, and ``fill_holes`` renders the
+fragments into the cached page for every request. Markers can't come from
+user content, as ``<`` is always escaped there. Hole arguments are ids.
+"""
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .forms import CommentCreateForm
+
+HOLES = {}
+HOLE_RE = re.compile(r'<!--hole:(\w+)((?::\w+)*)-->')
+
+
+def hole(name):
+    """Register the renderer of a hole, called with the request and args."""
+    def register(render):
+        HOLES[name] = render
+        return render
+    return register
+
+
+def render_hole(request, name, *args):
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(f'<!--hole:{":".join(map(str, (name, *args)))}-->')
+    return mark_safe(HOLES[name](request, *args))
+
+
+def fill_holes(request, content):
+    return HOLE_RE.sub(
+        lambda match: HOLES[match[1]](request, *match[2].split(':')[1:]),
+        content
+    )
+
+
+def is_author(request, author_id):
+    return request.user.is_authenticated and request.user.pk == int(author_id)
+
+
+@hole('header')
+def render_header(request):
+    return render_to_string('includes/header.html', request=request)
+
+
+@hole('post_actions')
+def render_post_actions(request, post_id, author_id):
+    if not is_author(request, author_id):
+        return ''
+    return render_to_string(
+        'includes/post_actions.html', {'post_id': post_id}
+    )
+
+
+@hole('comment_actions')
+def render_comment_actions(request, post_id, comment_id, author_id):
+    if not is_author(request, author_id):
+        return ''
+    return render_to_string(
+        'includes/comment_actions.html',
+        {'post_id': post_id, 'comment_id': comment_id}
+    )
+
+
+@hole('comment_form')
+def render_comment_form(request, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string(
+        'includes/comment_form.html',
+        {'form': CommentCreateForm(), 'post_id': post_id},
+        request=request
+    )
@@ -0,0 +1,220 @@
+"""
+Post images processed off the request thread.
+
+Saving a post with a new image only stores the upload; once the
+transaction commits, the image is decoded, stripped of its EXIF data and
+resized in a pool of POST_IMAGE_WORKERS processes (see blog.images), and
+the results are stored by a thread of the saving process. Until then the
+cards show the original image. A pool broken by a dying worker is replaced
+on the next submission; an image that could not be processed is left to
+the backfill_renditions command. Files no post uses any more are deleted,
+unless stored within MEDIA_RELEASE_GRACE seconds: the delete_orphan_media
+command deletes those later. An upload replaced by its copy stripped of
+EXIF data is deleted at once.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image
+
+from .images import get_rendition_files, process_image, save_renditions
+from .models import Post
+from .writes import run_write
+
+logger = logging.getLogger('blog.images')
+
+# Errors of a broken or hostile upload: the post keeps its original image
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def read_image(name):
+    storage = Post._meta.get_field('image').storage
+    with storage.open(name, 'rb') as file:
+        return file.read()
+
+
+def is_processed(post_id, name):
+    """Whether the image was processed already or is gone."""
+    renditions = Post.objects.filter(pk=post_id, image=name).values_list(
+        'image_renditions', flat=True
+    ).first()
+    return renditions is None or renditions.get('name') == name
+
+
+def store_processed_image(post_id, name, processed):
+    """
+    Store the processed image of a post, return the renditions record.
+
+    Nothing is stored when the post was deleted or got another image in
+    the meantime; None is returned then.
+    """
+    original, renditions = processed
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'image', 'image_renditions'
+    ).first()
+    if post is None or post.image.name != name:
+        return None
+    storage = post.image.storage
+    if original is not None:
+        # A new file: the upload may be shared with other posts
+        post.image.name = storage.save(name, ContentFile(original))
+    record = save_renditions(storage, post.image.name, renditions)
+    post.image_renditions = record
+    run_write(
+        lambda: post.save(update_fields=['image', 'image_renditions'])
+    )
+    if post.image.name != name:
+        # The upload still carries its EXIF data, such as the location
+        # the photo was taken at: it must not stay served
+        release_image(name, grace=False)
+    return record
+
+
+def is_recently_stored(storage, name):
+    """Whether a file was stored, or stored again, within the grace time."""
+    try:
+        modified = storage.get_modified_time(name).timestamp()
+    except OSError:
+        return False
+    return time.time() - modified < settings.MEDIA_RELEASE_GRACE
+
+
+def release_image(name, renditions=None, grace=True):
+    """
+    Delete an image and its renditions once no post uses it any more.
+
+    Stored files are shared by every post with the same image (see
+    blog.storage), so the posts referencing a file are its reference
+    count. An identical upload may be about to reference a file the
+    count misses: storing it again refreshes the file's modification time,
+    and files stored within MEDIA_RELEASE_GRACE seconds are kept, unless
+    ``grace`` is false. Returns whether all the files were deleted.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return False
+    storage = Post._meta.get_field('image').storage
+    names = [name]
+    if renditions and renditions.get('name') == name:
+        names += get_rendition_files(renditions)
+    released = [
+        released_name for released_name in names
+        if not grace or not is_recently_stored(storage, released_name)
+    ]
+    for released_name in released:
+        storage.delete(released_name)
+    return len(released) == len(names)
+
+
+class ImageProcessor:
+    """Process pool rendering post images, started on first use."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                # Forking a process running request threads is unsafe
+                self.executor = ProcessPoolExecutor(
+                    max_workers=(
+                        self.max_workers or settings.POST_IMAGE_WORKERS
+                    ),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self.executor
+
+    def reset_executor(self, executor):
+        """Drop a broken pool, the next submission starts a new one."""
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def submit(self, post_id, name):
+        """Process an image in the pool; the future resolves once stored."""
+        stored = Future()
+        try:
+            data = read_image(name)
+        except OSError as error:
+            logger.exception('Cannot read the image %s', name)
+            stored.set_exception(error)
+            return stored
+        executor = self.get_executor()
+        try:
+            processed = executor.submit(
+                process_image, data, tuple(settings.POST_IMAGE_WIDTHS)
+            )
+        except BrokenProcessPool:
+            # A worker died since, e.g. killed for its memory use
+            self.reset_executor(executor)
+            executor = self.get_executor()
+            processed = executor.submit(
+                process_image, data, tuple(settings.POST_IMAGE_WIDTHS)
+            )
+        processed.add_done_callback(
+            partial(self.store, executor, stored, post_id, name)
+        )
+        return stored
+
+    def store(self, executor, stored, post_id, name, processed):
+        # Runs in a thread of the executor, with its own connection
+        close_old_connections()
+        try:
+            stored.set_result(
+                store_processed_image(post_id, name, processed.result())
+            )
+        except Exception as error:
+            if isinstance(error, BrokenProcessPool):
+                self.reset_executor(executor)
+            logger.exception('Cannot process the image %s', name)
+            stored.set_exception(error)
+        finally:
+            close_old_connections()
+
+    def process(self, post_id, name):
+        """Process an image in the calling thread."""
+        try:
+            processed = process_image(
+                read_image(name), tuple(settings.POST_IMAGE_WIDTHS)
+            )
+        except IMAGE_ERRORS:
+            logger.exception('Cannot process the image %s', name)
+            return None
+        return store_processed_image(post_id, name, processed)
+
+    def schedule(self, post_id, name):
+        """
+        Process the image of a saved post.
+
+        Runs once the saving transaction commits, so it never raises: the
+        response of a saved post must not turn into an error. The post
+        keeps its original image until backfill_renditions processes it.
+        """
+        try:
+            if is_processed(post_id, name):
+                return
+            if settings.POST_IMAGE_PROCESSING == 'pool':
+                self.submit(post_id, name)
+            else:
+                self.process(post_id, name)
+        except Exception:
+            logger.exception('Cannot schedule the image %s', name)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+image_processor = ImageProcessor()
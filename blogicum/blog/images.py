@@ -0,0 +1,121 @@
+"""
+Resized renditions of post images.
+
+Every width of POST_IMAGE_WIDTHS narrower than the original is stored as
+JPEG and WebP next to the original, e.g. ``blog_images/photo.w640.webp``.
+``Post.image_renditions`` records them together with the name of the image
+they were made from, so renditions of a replaced image are never served.
+The original itself is re-encoded without its EXIF data (location, camera).
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# format: (file extension, save options)
+RENDITION_FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Originals re-encoded without their metadata: format: save options
+ORIGINAL_FORMATS = {
+    'jpeg': {'quality': 90, 'optimize': True},
+    'png': {'optimize': True},
+    'webp': {'quality': 90},
+}
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp')
+
+
+def get_rendition_name(name, width, image_format):
+    extension = RENDITION_FORMATS[image_format][0]
+    return f'{os.path.splitext(name)[0]}.w{width}.{extension}'
+
+
+def get_rendition_widths(source_width, widths):
+    """Widths to render: no upscaling, at least one rendition."""
+    widths = [width for width in widths if width < source_width]
+    return widths or [source_width]
+
+
+def encode(image, image_format, **options):
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def strip_original(source, image, image_format):
+    """
+    Re-encode the original without its metadata, None to keep it as is.
+
+    Images without EXIF or XMP data, animated images and formats Pillow
+    only reads are kept untouched, so an original is re-encoded once.
+    """
+    if (image_format not in ORIGINAL_FORMATS
+            or getattr(source, 'n_frames', 1) > 1
+            or not any(key in source.info for key in METADATA_KEYS)):
+        return None
+    return encode(
+        image, image_format, icc_profile=source.info.get('icc_profile'),
+        **ORIGINAL_FORMATS[image_format]
+    )
+
+
+def process_image(data, widths):
+    """
+    Decode an uploaded image and render everything stored for it.
+
+    Returns the original re-encoded without EXIF data (or None) and the
+    ``(width, format, bytes)`` renditions. Only Pillow is used here, so the
+    work can run in a process pool worker (see blog.image_processing).
+    """
+    source = Image.open(BytesIO(data))
+    image_format = (source.format or '').lower()
+    source.load()
+    # Apply the EXIF orientation, the stored images don't keep the EXIF data
+    image = ImageOps.exif_transpose(source)
+    renditions = []
+    for width in get_rendition_widths(image.width, widths):
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for rendition_format, (extension, options) in (
+                RENDITION_FORMATS.items()):
+            renditions.append(
+                (width, rendition_format,
+                 encode(resized, rendition_format, **options))
+            )
+    return strip_original(source, image, image_format), renditions
+
+
+def save_renditions(storage, name, renditions):
+    """Store rendered images next to the original, return their record."""
+    sources = {image_format: [] for image_format in RENDITION_FORMATS}
+    for width, image_format, content in renditions:
+        rendition_name = get_rendition_name(name, width, image_format)
+        if storage.exists(rendition_name):
+            storage.delete(rendition_name)
+        sources[image_format].append(
+            [width, storage.save(rendition_name, ContentFile(content))]
+        )
+    return {'name': name, 'sources': sources}
+
+
+def get_rendition_files(renditions):
+    """Names of the files of a renditions record."""
+    return [
+        name
+        for image_renditions in renditions.get('sources', {}).values()
+        for width, name in image_renditions
+    ]
+
+
+def get_current_renditions(post):
+    """Renditions of the post's current image, None until they exist."""
+    renditions = post.image_renditions
+    if not post.image or renditions.get('name') != post.image.name:
+        return None
+    return renditions['sources']
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.cache import invalidate_page_cache
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Fill Post.excerpt in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts updated per transaction.'
+        )
+        parser.add_argument(
+            '--all', action='store_true', dest='recompute_all',
+            help='Recompute every excerpt, not only the empty ones.'
+        )
+
+    def handle(self, *args, batch_size, recompute_all, **options):
+        queryset = Post.objects.order_by('pk').only('pk', 'text', 'excerpt')
+        if not recompute_all:
+            queryset = queryset.filter(excerpt='')
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for post in batch:
+                excerpt = Post.make_excerpt(post.text)
+                if post.excerpt != excerpt:
+                    post.excerpt = excerpt
+                    changed.append(post)
+            with transaction.atomic():
+                Post.objects.bulk_update(changed, ['excerpt'])
+            updated += len(changed)
+        if updated:
+            invalidate_page_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} excerpts.'
+        ))
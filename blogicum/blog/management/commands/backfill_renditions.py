@@ -0,0 +1,59 @@
+from concurrent.futures import wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.image_processing import image_processor
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the missing renditions of post images in batches,'
+        ' in the image worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of posts loaded at a time.'
+        )
+        parser.add_argument(
+            '--all', action='store_true', dest='rerender_all',
+            help='Render the renditions of every image again.'
+        )
+
+    def handle(self, *args, batch_size, rerender_all, **options):
+        queryset = Post.objects.exclude(image='').order_by('pk').only(
+            'pk', 'image', 'image_renditions'
+        )
+        last_pk = 0
+        rendered = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            posts = [
+                post for post in batch if rerender_all
+                or post.image_renditions.get('name') != post.image.name
+            ]
+            if settings.POST_IMAGE_PROCESSING == 'pool':
+                futures = [
+                    image_processor.submit(post.pk, post.image.name)
+                    for post in posts
+                ]
+                wait(futures)
+                records = [
+                    future.result() for future in futures
+                    if not future.exception()
+                ]
+            else:
+                records = [
+                    image_processor.process(post.pk, post.image.name)
+                    for post in posts
+                ]
+            rendered += sum(1 for record in records if record)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered the images of {rendered} posts.'
+        ))
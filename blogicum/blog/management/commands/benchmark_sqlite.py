@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.sqlite import get_pragma_statements
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure read throughput of SQLite while writers are active, with '
+        'the default settings and with SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Seconds each configuration runs.'
+        )
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Number of reading threads.'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=2,
+            help='Number of writing threads.'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=5000,
+            help='Number of posts the database starts with.'
+        )
+
+    def handle(self, *args, duration, readers, writers, rows, **options):
+        for label, statements in (
+            ('default', []),
+            ('tuned', get_pragma_statements()),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.create_database(path, statements, rows)
+                stats = self.run(path, statements, duration, readers, writers)
+            self.stdout.write(
+                f'{label:>8}: {stats["reads"] / duration:10.1f} reads/s '
+                f'{stats["writes"] / duration:8.1f} writes/s '
+                f'{stats["locked"]:6d} locked errors'
+            )
+
+    def connect(self, path, statements):
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        for statement in statements:
+            connection.execute(statement)
+        return connection
+
+    def create_database(self, path, statements, rows):
+        connection = self.connect(path, statements)
+        connection.executescript('''
+            CREATE TABLE post (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                pub_date REAL NOT NULL,
+                comment_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX post_pub_date ON post (pub_date, id);
+            CREATE TABLE comment (
+                id INTEGER PRIMARY KEY,
+                post_id INTEGER NOT NULL REFERENCES post (id),
+                text TEXT NOT NULL
+            );
+        ''')
+        now = time.time()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO post (title, pub_date) VALUES (?, ?)',
+                ((f'Post {number}', now - number) for number in range(rows))
+            )
+        connection.close()
+
+    def run(self, path, statements, duration, readers, writers):
+        self.stats = {'reads': 0, 'writes': 0, 'locked': 0}
+        self.stats_lock = threading.Lock()
+        self.deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=self.read, args=(path, statements))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(
+                target=self.write, args=(path, statements, number)
+            )
+            for number in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats
+
+    def count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def read(self, path, statements):
+        connection = self.connect(path, statements)
+        while time.monotonic() < self.deadline:
+            try:
+                connection.execute(
+                    'SELECT id, title, comment_count FROM post '
+                    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+                ).fetchall()
+            except sqlite3.OperationalError:
+                self.count('locked')
+            else:
+                self.count('reads')
+        connection.close()
+
+    def write(self, path, statements, number):
+        connection = self.connect(path, statements)
+        post_id = number + 1
+        while time.monotonic() < self.deadline:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO comment (post_id, text) VALUES (?, ?)',
+                    (post_id, 'Комментарий')
+                )
+                connection.execute(
+                    'UPDATE post SET comment_count = comment_count + 1 '
+                    'WHERE id = ?', (post_id,)
+                )
+                connection.execute('COMMIT')
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                self.count('locked')
+            else:
+                self.count('writes')
+        connection.close()
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default SQLite database to the DATABASE_REPLICAS, '
+        'standing in for replication in local setups.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS is empty.')
+        for alias in ['default', *settings.DATABASE_REPLICAS]:
+            if not settings.DATABASES[alias]['ENGINE'].endswith('sqlite3'):
+                raise CommandError(f'{alias} is not an SQLite database.')
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # The backup API copies a consistent snapshot, even
+                    # while the primary is being written to
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Copied default to {alias}.')
+        finally:
+            source.close()
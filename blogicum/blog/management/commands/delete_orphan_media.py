@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.image_processing import is_recently_stored
+from blog.images import get_rendition_files
+from blog.models import Post
+from blog.storage import ContentAddressedStorage, is_content_addressed
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the content-addressed media files no post uses, once they'
+        ' are older than MEDIA_RELEASE_GRACE.'
+    )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError(
+                'Post images are not stored in a ContentAddressedStorage.'
+            )
+        # Collected before the walk: a file referenced since was stored
+        # since, so it is within the grace time
+        used = set()
+        posts = Post.objects.exclude(image='').values_list(
+            'image', 'image_renditions'
+        )
+        for name, renditions in posts.iterator():
+            used.add(name)
+            used.update(get_rendition_files(renditions))
+        deleted = 0
+        for name in self.get_stored_files(storage):
+            if name not in used and not is_recently_stored(storage, name):
+                storage.delete(name)
+                deleted += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} orphan files.'
+        ))
+
+    def get_stored_files(self, storage):
+        for directory, directories, files in os.walk(storage.location):
+            for filename in files:
+                name = os.path.relpath(
+                    os.path.join(directory, filename), storage.location
+                ).replace(os.sep, '/')
+                if is_content_addressed(name):
+                    yield name
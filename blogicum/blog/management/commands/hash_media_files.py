@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.cache import invalidate_cached_posts, invalidate_page_cache
+from blog.image_processing import release_image
+from blog.models import Post
+from blog.storage import ContentAddressedStorage, is_content_addressed
+
+
+class Command(BaseCommand):
+    help = (
+        'Move post images and their renditions stored under their upload'
+        ' names to content-addressed names, in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of posts loaded at a time.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        self.storage = Post._meta.get_field('image').storage
+        if not isinstance(self.storage, ContentAddressedStorage):
+            raise CommandError(
+                'Post images are not stored in a ContentAddressedStorage.'
+            )
+        queryset = Post.objects.exclude(image='').order_by('pk').only(
+            'pk', 'image', 'image_renditions'
+        )
+        # Old name: new name, for files shared by several posts
+        self.moved = {}
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            updated += self.move_batch(batch)
+        if updated:
+            invalidate_page_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved the images of {updated} posts.'
+        ))
+
+    def move_batch(self, batch):
+        released = []
+        for post in batch:
+            name = post.image.name
+            if is_content_addressed(name):
+                continue
+            try:
+                if self.move(post):
+                    released.append((name, post.image_renditions))
+            except OSError as error:
+                self.stderr.write(f'Cannot move {name}: {error}')
+        # The old files are kept while posts of later batches use them
+        for name, renditions in released:
+            release_image(name, renditions)
+        invalidate_cached_posts([post.pk for post in batch])
+        return len(released)
+
+    def move_file(self, name):
+        if name not in self.moved:
+            with self.storage.open(name, 'rb') as file:
+                self.moved[name] = self.storage.save(name, file)
+        return self.moved[name]
+
+    def move(self, post):
+        """Store a copy of the post files, return whether the post moved."""
+        name = post.image.name
+        new_name = self.move_file(name)
+        renditions = {}
+        if post.image_renditions.get('name') == name:
+            renditions = {
+                'name': new_name,
+                'sources': {
+                    image_format: [
+                        [width, self.move_file(rendition_name)]
+                        for width, rendition_name in sources
+                    ]
+                    for image_format, sources in
+                    post.image_renditions['sources'].items()
+                },
+            }
+        # Updated in place: nothing but the names changes
+        return Post.objects.filter(pk=post.pk, image=name).update(
+            image=new_name, image_renditions=renditions
+        ) == 1
@@ -0,0 +1,30 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.cache import get_post_card_stats, reset_post_card_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counters of the post card fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Reset the counters after printing them.'
+        )
+
+    def handle(self, *args, reset, **options):
+        if isinstance(caches['default'], LocMemCache):
+            # The serving processes count in their own memory
+            raise CommandError(
+                'The counters are only readable from a cache shared with'
+                ' the serving processes, see CACHES.'
+            )
+        stats = get_post_card_stats()
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit rate: {stats["hit_rate"]:.1%}'
+        )
+        if reset:
+            reset_post_card_stats()
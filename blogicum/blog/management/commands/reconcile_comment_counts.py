@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.cache import invalidate_page_cache
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute drifted Post.comment_count values in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of posts checked per transaction.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report drifted posts, do not update them.'
+        )
+
+    def handle(self, *args, chunk_size, dry_run, **options):
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(actual=Count('comments'))
+                .values_list('pk', 'comment_count', 'actual')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            checked += len(chunk)
+            drifted = [pk for pk, stored, actual in chunk if stored != actual]
+            fixed += len(drifted)
+            if drifted and not dry_run:
+                # Recount inside the UPDATE so concurrent comments are kept
+                counts = Comment.objects.filter(
+                    post=OuterRef('pk')
+                ).order_by().values('post').annotate(
+                    n=Count('pk')
+                ).values('n')
+                Post.objects.filter(pk__in=drifted).update(
+                    comment_count=Coalesce(Subquery(counts), 0)
+                )
+        if fixed and not dry_run:
+            invalidate_page_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} posts, '
+            f'{"found" if dry_run else "fixed"} {fixed} drifted counters.'
+        ))
@@ -0,0 +1,216 @@
+"""
+Serving of uploaded media.
+
+Only files inside MEDIA_ROOT are served, hidden files (such as uploads
+being stored) never are. Content-addressed files (see blog.storage) never
+change, so they get their digest as a strong ETag and an immutable
+``Cache-Control``; other files get a strong ETag made of their size and
+modification time and are cached for MEDIA_CACHE_MAX_AGE seconds.
+
+With MEDIA_SENDFILE_HEADER set, the file itself is sent by the front
+server: ``X-Accel-Redirect`` points nginx to the MEDIA_ACCEL_PREFIX
+internal location, ``X-Sendfile`` gives Apache or lighttpd the path. The
+front server then also answers range requests. Otherwise the file is
+sent by a ``FileResponse``, which hands it to the server's
+``wsgi.file_wrapper`` (``sendfile()`` under gunicorn or uWSGI), and a
+single byte range is answered with ``206 Partial Content``. The static
+files view (see blog.staticfiles) sends its files the same way.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    http_date, parse_etags, parse_http_date_safe, quote_etag
+)
+
+from .storage import HASHED_NAME_RE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# One year, the longest lifetime caches are asked to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class RangeFile:
+    """Read ``length`` bytes of a file from ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def get_file_path(root, path):
+    """Absolute path of a file served from ``root``, Http404 if none."""
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(root, posixpath.normpath(path))
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+    return full_path, stat_result
+
+
+def get_content_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    # A compressed file is served as is, not as the file it compresses
+    if encoding or not content_type:
+        return 'application/octet-stream'
+    return content_type
+
+
+def get_etag(path, stat_result):
+    match = HASHED_NAME_RE.search(path)
+    if match:
+        return quote_etag(match.group('digest').rsplit('/', 1)[-1])
+    return quote_etag(
+        f'{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}'
+    )
+
+
+def parse_range(header, size):
+    """
+    The ``(start, length)`` of a single byte range, None for the whole file.
+
+    Raises ValueError for a range outside of the file. Several ranges are
+    answered with the whole file, as RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # The last bytes of the file
+        length = min(int(last), size)
+        if not length:
+            raise ValueError('Unsatisfiable range.')
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range.')
+    return start, end - start + 1
+
+
+def is_range_current(request, etag, last_modified):
+    """Whether the If-Range precondition, if any, holds."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Only strong ETags validate a range
+        return not if_range.startswith('W/') and parse_etags(if_range) == [
+            etag
+        ]
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_media(request, path):
+    full_path, stat_result = get_file_path(settings.MEDIA_ROOT, path)
+    return serve_file(
+        request, full_path, stat_result,
+        etag=get_etag(path, stat_result),
+        immutable=bool(HASHED_NAME_RE.search(path)),
+        max_age=settings.MEDIA_CACHE_MAX_AGE,
+        offload_path=settings.MEDIA_ACCEL_PREFIX + quote(path),
+    )
+
+
+def serve_file(request, full_path, stat_result, etag, immutable, max_age,
+               content_type=None, offload_path=None):
+    """
+    Answer a request for a file with its validators and cache headers.
+
+    ``offload_path`` is the MEDIA_ACCEL_PREFIX location of files the front
+    server may send, None for the others.
+    """
+    last_modified = int(stat_result.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = send_file(
+            request, full_path, stat_result, etag,
+            content_type or get_content_type(full_path), offload_path
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if immutable:
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def send_file(request, full_path, stat_result, etag, content_type,
+              offload_path=None):
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header and offload_path is not None:
+        response = HttpResponse(content_type=content_type)
+        if header == 'X-Accel-Redirect':
+            response[header] = offload_path
+        else:
+            response[header] = full_path
+        return response
+
+    size = stat_result.st_size
+    start, length = 0, size
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and is_range_current(
+        request, etag, int(stat_result.st_mtime)
+    ):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, length = byte_range
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    elif length == size:
+        # Whole file: the server may send it with sendfile()
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    else:
+        response = FileResponse(
+            RangeFile(open(full_path, 'rb'), start, length),
+            content_type=content_type,
+        )
+    if length != size:
+        response.status_code = 206
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,173 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import start_replica_reads, stop_replica_reads
+
+logger = logging.getLogger('blog.profiling')
+
+
+class RequestProfile:
+    """Timings collected while serving a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+        self.view_started = None
+        self.render_started = None
+        self.render_time = 0.0
+        # Part of render_time spent inside the view, see render_response
+        self.view_render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += duration
+            if duration > self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+    def render_done(self, response):
+        self.render_time += time.perf_counter() - self.render_started
+
+    def add_view_render_time(self, duration):
+        self.render_time += duration
+        self.view_render_time += duration
+
+    def as_dict(self, view_finished, finished):
+        view_started = self.view_started or self.started
+        view_finished = self.render_started or view_finished
+        return {
+            'queries': self.queries,
+            'sql_ms': self.sql_time * 1000,
+            'slowest_sql_ms': self.slowest_time * 1000,
+            'slowest_sql': self.slowest_sql[:500],
+            'render_ms': self.render_time * 1000,
+            'view_ms': (
+                view_finished - view_started - self.view_render_time
+            ) * 1000,
+            'total_ms': (finished - self.started) * 1000,
+        }
+
+
+def render_response(request, response):
+    """
+    Render a template response within the view, e.g. to cache the page.
+
+    The time is profiled as render time: the response reaches the
+    middleware already rendered.
+    """
+    started = time.perf_counter()
+    response.render()
+    profile = getattr(request, '_profile', None)
+    if profile is not None:
+        profile.add_view_render_time(time.perf_counter() - started)
+
+
+class RequestProfilingMiddleware:
+    """
+    Middleware measuring where the time of a request goes.
+
+    A sampled request gets a ``Server-Timing`` header with the query count,
+    total and slowest SQL time, template render time, view time and total
+    time. With REQUEST_PROFILING_LOG the same numbers are also logged as a
+    JSON line to the ``blog.profiling`` logger. Queries are timed through
+    ``connection.execute_wrapper``, which works with DEBUG off.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = request._profile = RequestProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+            view_finished = time.perf_counter()
+        stats = profile.as_dict(view_finished, time.perf_counter())
+
+        response['Server-Timing'] = ', '.join((
+            f'sql;dur={stats["sql_ms"]:.1f};desc="{stats["queries"]} queries"',
+            f'sql-slowest;dur={stats["slowest_sql_ms"]:.1f}',
+            f'render;dur={stats["render_ms"]:.1f}',
+            f'view;dur={stats["view_ms"]:.1f}',
+            f'total;dur={stats["total_ms"]:.1f}',
+        ))
+        if settings.REQUEST_PROFILING_LOG:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **stats,
+            }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+            response.add_post_render_callback(profile.render_done)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware letting safe requests read from the database replicas.
+
+    A request that writes sets the REPLICA_PIN_COOKIE for
+    REPLICA_PIN_SECONDS; until it expires the user reads from the primary,
+    so they see their own writes despite the replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allowed = (
+            request.method in ('GET', 'HEAD', 'OPTIONS')
+            and not self.is_pinned(request)
+        )
+        state, token = start_replica_reads(allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_replica_reads(token)
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def is_pinned(self, request):
+        try:
+            pinned_until = float(
+                request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0)
+            )
+        except ValueError:
+            return False
+        return pinned_until > time.time()
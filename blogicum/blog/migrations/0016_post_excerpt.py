@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+from blog.models import Post as CurrentPost
+
+
+def fill_excerpt(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.only('pk', 'text').iterator(chunk_size=500)
+    batch = []
+    for post in posts:
+        # The helper of the current model, so the excerpts match save()
+        post.excerpt = CurrentPost.make_excerpt(post.text)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Отрывок'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.text import Truncator
+
+from .visibility import PostVisibility
 
 User = get_user_model()
 
@@ -51,14 +54,116 @@ class Post(BaseModel):
         related_name='posts'
     )
     image = models.ImageField('Фото', upload_to='blog_images', blank=True)
+    # Resized copies of the image, rendered off the request by
+    # blog.image_processing
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Версии изображения'
+    )
+    # Set on every save; the default covers raw saves such as loaddata,
+    # which skip save() and auto_now alike
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name='Изменено'
+    )
+    # First words of the text shown by list views, filled in on save
+    excerpt = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Отрывок'
+    )
+    # Denormalized number of comments, maintained by the Comment signals
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     def __str__(self):
         return self.title
 
+    EXCERPT_WORDS = 10
+
+    @classmethod
+    def make_excerpt(cls, text):
+        """Same output as the ``truncatewords`` filter."""
+        return Truncator(text).words(cls.EXCERPT_WORDS, truncate=' …')
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        deferred = self.get_deferred_fields()
+        if 'text' not in deferred:
+            self.excerpt = self.make_excerpt(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        # Never overwrite the counter and the renditions with stale
+        # in-memory values
+        if (
+            not self._state.adding and self.pk is not None
+            and not kwargs.get('force_insert')
+            and update_fields is None
+        ):
+            skipped = deferred | {'comment_count', 'image_renditions'}
+            if 'text' in deferred:
+                skipped.add('excerpt')
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            # Published feed: the partial index holds published posts only
+            models.Index(
+                fields=('pub_date', 'id'),
+                condition=models.Q(is_published=True),
+                name='post_published_feed_idx',
+            ),
+            models.Index(
+                fields=('category', 'pub_date', 'id'),
+                condition=models.Q(is_published=True),
+                name='post_category_feed_idx',
+            ),
+            # Author profile, including the author's unpublished posts
+            models.Index(
+                fields=('author', 'pub_date', 'id'),
+                name='post_author_pub_date_idx',
+            ),
+        )
+
+    @classmethod
+    def change_comment_count(cls, post_id, delta):
+        """Atomically shift the stored comment counter of a post."""
+        queryset = cls.objects.filter(pk=post_id)
+        if delta < 0:
+            queryset = queryset.filter(comment_count__gte=-delta)
+        queryset.update(
+            comment_count=models.F('comment_count') + delta,
+            updated_at=timezone.now()
+        )
+
+    @classmethod
+    def touch(cls, post_id):
+        """Mark a post as changed, e.g. when one of its comments is edited."""
+        cls.objects.filter(pk=post_id).update(updated_at=timezone.now())
+
+    @classmethod
+    def get_card_queryset(cls, queryset=None):
+        """Returns posts with everything post_card.html needs joined in."""
+        if queryset is None:
+            queryset = cls.objects.all()
+        # Cards show the stored excerpt, so the full text is never fetched
+        return queryset.select_related(
+            'author', 'category', 'location'
+        ).defer('text')
 
     # Method to get published posts, limit the number of posts returned
     @classmethod
@@ -67,29 +172,15 @@ class Post(BaseModel):
         Returns published posts or all posts for the author.
         - If a user is provided and they are the author, unpublished posts will be included.
         - If no user is provided or the user is not the author, only published posts are returned.
-        """
-        if queryset is None:
-            queryset = cls.objects.all()
 
-        # If the user is provided, include the user's own posts (including unpublished)
-        if user is not None:
-            queryset = queryset.filter(
-                models.Q(author=user) | (
-                        models.Q(pub_date__lte=timezone.now()) &
-                        models.Q(is_published=True) &
-                        models.Q(category__is_published=True)
-                )
-            )
-        else:
-
-            queryset = queryset.filter(
-                pub_date__lte=timezone.now(),
-                is_published=True,
-                category__is_published=True
-            )
-        queryset = queryset.annotate(comment_count=models.Count('comments')).order_by(*cls._meta.ordering)
+        For an authenticated user the result is a UNION ALL queryset (see
+        PostVisibility); filter it with blog.visibility.filter_posts().
+        """
+        queryset = PostVisibility(cls.get_card_queryset(queryset), user)
+        queryset = queryset.as_queryset().order_by(*cls._meta.ordering)
         return queryset if n is None else queryset[:n]
 
+
 # Location model represents a place associated with posts
 class Location(BaseModel):
     name = models.CharField(max_length=256,
@@ -0,0 +1,160 @@
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .visibility import filter_posts
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorPage:
+    """A page of objects fetched by a (pub_date, id) keyset."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator ordered by ``(-pub_date, -id)`` by default.
+
+    Instead of ``OFFSET`` each page seeks past the last row of the previous
+    one, so deep pages cost the same as the first one and no ``COUNT(*)``
+    is issued. Cursors are opaque url-safe tokens; an empty cursor means
+    the first page. Any ``(<datetime field>, id)`` ordering can be passed;
+    other value types override ``encode_value`` and ``decode_value``.
+    """
+
+    is_cursor = True
+    ordering = ('-pub_date', '-id')
+    forward = 'n'
+    backward = 'p'
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.field = self.ordering[0].lstrip('-')
+        self.descending = self.ordering[0].startswith('-')
+
+    def encode_cursor(self, direction, obj):
+        payload = json.dumps(
+            [direction, self.encode_value(getattr(obj, self.field)), obj.pk],
+            separators=(',', ':')
+        )
+        return urlsafe_base64_encode(payload.encode())
+
+    def encode_value(self, value):
+        return value.isoformat()
+
+    def decode_value(self, value):
+        value = parse_datetime(value)
+        if value is None:
+            raise ValueError('Invalid datetime.')
+        return value
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, value, pk = json.loads(
+                force_str(urlsafe_base64_decode(cursor))
+            )
+            value = self.decode_value(value)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor.')
+        if direction not in (self.forward, self.backward):
+            raise InvalidCursor('Invalid cursor.')
+        return direction, value, pk
+
+    def seek(self, direction, value, pk):
+        """Rows strictly after (or before) the cursor row."""
+        lookup = 'lt' if self.descending == (direction == self.forward) \
+            else 'gt'
+        return filter_posts(
+            self.queryset,
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'id__{lookup}': pk})
+        )
+
+    def get_page(self, cursor=None):
+        """Return the page following (or preceding) the given cursor."""
+        if not cursor:
+            rows = list(
+                self.queryset.order_by(*self.ordering)[:self.per_page + 1]
+            )
+            return self._build_page(rows, has_previous=False)
+
+        direction, value, pk = self.decode_cursor(cursor)
+        if direction == self.forward:
+            rows = list(self.seek(direction, value, pk).order_by(
+                *self.ordering
+            )[:self.per_page + 1])
+            return self._build_page(rows, has_previous=True)
+
+        # Walk backwards in reversed order, then restore the page order
+        reversed_ordering = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+        rows = list(self.seek(direction, value, pk).order_by(
+            *reversed_ordering
+        )[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows, self,
+            next_cursor=(
+                self.encode_cursor(self.forward, rows[-1]) if rows else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(self.backward, rows[0])
+                if has_previous else None
+            ),
+        )
+
+    def _build_page(self, rows, has_previous):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self,
+            next_cursor=(
+                self.encode_cursor(self.forward, rows[-1])
+                if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(self.backward, rows[0])
+                if has_previous and rows else None
+            ),
+        )
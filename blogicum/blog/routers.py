@@ -0,0 +1,103 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Label of the entries of the database cache backend
+CACHE_APP_LABEL = 'django_cache'
+
+
+class ReplicaReads:
+    """Routing state of the current request."""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.wrote = False
+
+
+_replica_reads = ContextVar('replica_reads', default=None)
+
+
+def start_replica_reads(allowed):
+    """Route the reads of the current request; returns a reset token."""
+    state = ReplicaReads(allowed)
+    return state, _replica_reads.set(state)
+
+
+def stop_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def note_write():
+    """
+    Pin the current request to the primary after a write.
+
+    For writes made on its behalf by another thread, such as the comment
+    writer, where the routing state of the request is not set.
+    """
+    state = _replica_reads.get()
+    if state is not None:
+        state.wrote = True
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary within the block.
+
+    For values shared with other users, such as cache entries: one filled
+    from a lagging replica would serve stale data past the replication lag.
+    """
+    state = _replica_reads.get()
+    if state is None or not state.allowed:
+        yield
+        return
+    state.allowed = False
+    try:
+        yield
+    finally:
+        state.allowed = True
+
+
+class ReplicaRouter:
+    """
+    Router sending reads to DATABASE_REPLICAS and writes to the primary.
+
+    Reads only go to a replica inside a request that allows it (see
+    ``ReplicaRoutingMiddleware``); commands, the comment writer and requests
+    of users who wrote recently read from the primary, so they see their
+    own writes. Entries of caches shared between users are filled from the
+    primary too (see ``primary_reads``). Replicas are never migrated, they
+    are copies of the primary.
+    The database cache has its own CACHE_DATABASE alias.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return settings.CACHE_DATABASE
+        state = _replica_reads.get()
+        if state is None or not state.allowed or state.wrote:
+            return PRIMARY
+        replicas = settings.DATABASE_REPLICAS
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            # Filling the cache is no write the user has to read back
+            return settings.CACHE_DATABASE
+        note_write()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == CACHE_APP_LABEL:
+            return db == settings.CACHE_DATABASE
+        return (
+            db not in settings.DATABASE_REPLICAS
+            and db != settings.CACHE_DATABASE
+        )
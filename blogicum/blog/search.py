@@ -0,0 +1,132 @@
+"""
+Full-text search over posts with the SQLite FTS5 index ``blog_post_search``.
+
+The index mirrors ``Post.title`` and ``Post.text`` and is kept in sync by
+triggers on ``blog_post`` (see migration 0018), so bulk updates are indexed
+too. SQLite drops the triggers whenever a migration rebuilds ``blog_post``,
+so ``install_search_triggers`` puts them back after every migrate. Queries
+are ranked with BM25, a title match weighing more than a text match.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .pagination import CursorPaginator
+
+# BM25 weights of the title and text columns
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+MAX_TERMS = 10
+TERM_RE = re.compile(r'\w+')
+
+TRIGGERS = {
+    'blog_post_search_insert': """
+        CREATE TRIGGER blog_post_search_insert AFTER INSERT ON blog_post
+        BEGIN
+            INSERT INTO blog_post_search (rowid, title, text)
+            VALUES (new.id, new.title, new.text);
+        END
+    """,
+    'blog_post_search_delete': """
+        CREATE TRIGGER blog_post_search_delete AFTER DELETE ON blog_post
+        BEGIN
+            INSERT INTO blog_post_search (blog_post_search, rowid, title, text)
+            VALUES ('delete', old.id, old.title, old.text);
+        END
+    """,
+    'blog_post_search_update': """
+        CREATE TRIGGER blog_post_search_update
+        AFTER UPDATE OF title, text ON blog_post
+        BEGIN
+            INSERT INTO blog_post_search (blog_post_search, rowid, title, text)
+            VALUES ('delete', old.id, old.title, old.text);
+            INSERT INTO blog_post_search (rowid, title, text)
+            VALUES (new.id, new.title, new.text);
+        END
+    """,
+}
+
+
+def install_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_migrate`` receiver restoring dropped index triggers.
+
+    The index is rebuilt when a trigger was missing, as posts may have
+    changed meanwhile.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'blog_post_search' not in tables:
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [sql for name, sql in TRIGGERS.items()
+                   if name not in existing]
+        for sql in missing:
+            cursor.execute(sql)
+        if missing:
+            cursor.execute(
+                "INSERT INTO blog_post_search (blog_post_search) "
+                "VALUES ('rebuild')"
+            )
+
+
+def build_match_query(query):
+    """
+    FTS5 query matching posts with every word of ``query`` as a prefix.
+
+    Words are quoted, so FTS5 operators in user input are taken literally.
+    Returns an empty string when the query has no words.
+    """
+    terms = TERM_RE.findall(query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_posts(queryset, query):
+    """Posts of ``queryset`` matching ``query``, annotated with their rank."""
+    match = build_match_query(query)
+    if not match:
+        # Still orderable by rank, but never sent to the database
+        return queryset.annotate(rank=Value(0.0, FloatField())).none()
+    # The FTS table has no model; bm25() needs it joined in the same query
+    return queryset.extra(
+        tables=['blog_post_search'],
+        where=[
+            'blog_post_search.rowid = blog_post.id',
+            'blog_post_search MATCH %s',
+        ],
+        params=[match],
+    ).annotate(rank=RawSQL(
+        'bm25(blog_post_search, %s, %s)', (TITLE_WEIGHT, TEXT_WEIGHT)
+    ))
+
+
+def filter_matching(queryset, query):
+    """Posts of ``queryset`` matching ``query``, without ranking."""
+    match = build_match_query(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        'SELECT rowid FROM blog_post_search WHERE blog_post_search MATCH %s',
+        (match,)
+    ))
+
+
+class SearchCursorPaginator(CursorPaginator):
+    """Keyset paginator over search results, best ranked first."""
+
+    # bm25() is lower for better matches
+    ordering = ('rank', 'id')
+
+    def encode_value(self, value):
+        return value
+
+    def decode_value(self, value):
+        return float(value)
@@ -0,0 +1,177 @@
+from contextvars import ContextVar
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .cache import invalidate_cached_posts, invalidate_page_cache
+from .image_processing import image_processor, release_image
+from .models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+# Ids of the posts being deleted: their comments are deleted with them, and
+# the post's own receivers drop the caches
+_deleted_posts = ContextVar('deleted_posts', default=frozenset())
+
+
+def is_post_deleted(comment):
+    return comment.post_id in _deleted_posts.get()
+
+
+@receiver(pre_delete, sender=Post)
+def start_post_deletion(sender, instance, **kwargs):
+    _deleted_posts.set(_deleted_posts.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Post)
+def finish_post_deletion(sender, instance, **kwargs):
+    _deleted_posts.set(_deleted_posts.get() - {instance.pk})
+
+
+def invalidate_on_commit(invalidate, *args):
+    """
+    Run ``invalidate(*args)`` now and again once the transaction commits.
+
+    A cache entry filled from the old rows while the transaction runs is
+    dropped by the second call.
+    """
+    invalidate(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(invalidate, *args))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def drop_cached_pages(sender, instance, **kwargs):
+    if isinstance(instance, Comment) and is_post_deleted(instance):
+        return
+    invalidate_on_commit(invalidate_page_cache)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_cached_post(sender, instance, **kwargs):
+    invalidate_on_commit(invalidate_cached_posts, [instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def process_post_image(sender, instance, update_fields=None, **kwargs):
+    if (update_fields is not None and 'image' not in update_fields
+            or 'image' in instance.get_deferred_fields()):
+        return
+    renditions = instance.image_renditions
+    if not instance.image:
+        if renditions:
+            instance.image_renditions = {}
+            instance.save(update_fields=['image_renditions'])
+        return
+    if renditions.get('name') == instance.image.name:
+        return
+    # Saving the post doesn't wait for the image to be processed
+    post_id, name = instance.pk, instance.image.name
+    transaction.on_commit(lambda: image_processor.schedule(post_id, name))
+
+
+@receiver(pre_save, sender=Post)
+def fill_fixture_excerpt(sender, instance, raw=False, **kwargs):
+    # Fixtures are saved without Post.save(), which fills the excerpt
+    if raw and not instance.excerpt:
+        instance.excerpt = Post.make_excerpt(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+def remember_replaced_image(sender, instance, update_fields=None, **kwargs):
+    if (instance._state.adding
+            or update_fields is not None and 'image' not in update_fields
+            or 'image' in instance.get_deferred_fields()):
+        return
+    instance._replaced_image = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('image', 'image_renditions').first()
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    name, renditions = instance.__dict__.pop('_replaced_image', None) or (
+        None, None
+    )
+    if name and name != instance.image.name:
+        transaction.on_commit(lambda: release_image(name, renditions))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if {'image', 'image_renditions'} & instance.get_deferred_fields():
+        return
+    name, renditions = instance.image.name, instance.image_renditions
+    if name:
+        transaction.on_commit(lambda: release_image(name, renditions))
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    # Fixtures carry their counters
+    if created and not raw:
+        Post.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    # Every deletion sends it: views, admin, cascades and bulk deletes
+    if not is_post_deleted(instance):
+        Post.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def drop_commented_post(sender, instance, **kwargs):
+    if is_post_deleted(instance):
+        return
+    # The cached post carries the comment counter, which moves with the
+    # comment, in the same transaction
+    invalidate_on_commit(invalidate_cached_posts, [instance.post_id])
+
+
+def drop_posts_of(**lookup):
+    """Drop the cached posts of a changed category, location or user."""
+    invalidate_on_commit(invalidate_cached_posts, list(
+        Post.objects.filter(**lookup).values_list('id', flat=True)
+    ))
+
+
+# Before the deletion, which unlinks the posts
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def drop_category_posts(sender, instance, **kwargs):
+    drop_posts_of(category_id=instance.pk)
+
+
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Location)
+def drop_location_posts(sender, instance, **kwargs):
+    drop_posts_of(location_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def drop_author_posts(sender, instance, created, update_fields=None,
+                      **kwargs):
+    # Logging in only touches last_login, which posts don't show, and new
+    # users have neither posts nor comments yet
+    if created or (
+        update_fields is not None and set(update_fields) <= {'last_login'}
+    ):
+        return
+    drop_posts_of(author_id=instance.pk)
+    # Shared pages show authors and commenters by their username
+    invalidate_on_commit(invalidate_page_cache)
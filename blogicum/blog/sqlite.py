@@ -0,0 +1,19 @@
+from django.conf import settings
+
+
+def get_pragma_statements(pragmas=None):
+    """``PRAGMA`` statements for the given (by default SQLITE_PRAGMAS) map."""
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    # journal_mode first: switching to WAL needs no other pending setting
+    names = sorted(pragmas, key=lambda name: name != 'journal_mode')
+    return [f'PRAGMA {name} = {pragmas[name]}' for name in names]
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """``connection_created`` receiver tuning every SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in get_pragma_statements():
+            cursor.execute(statement)
@@ -0,0 +1,139 @@
+"""
+Static files with hashed names and precompressed variants.
+
+``collectstatic`` stores every file under a name carrying the hash of its
+content (ManifestStaticFilesStorage), then writes ``.gz`` and, with the
+``brotli`` package from requirements.txt, ``.br`` variants of the text
+files next to them, STATIC_COMPRESS_WORKERS files at a time. The
+serve_static view sends the smallest variant the client accepts, and
+hashed names never change, so caches may keep them for good.
+"""
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+
+from .media import get_content_type, get_etag, get_file_path, serve_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico',
+)
+# Smaller files don't gain from compression
+COMPRESS_MIN_SIZE = 256
+# A variant has to save at least 5% of the size to be stored
+COMPRESS_MAX_RATIO = 0.95
+# Content coding: file suffix, best first
+COMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def get_compressors():
+    compressors = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data)))
+    return compressors
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage also writing compressed variants of text files."""
+
+    def stored_name(self, name):
+        # Before collectstatic (development, tests) the files keep their
+        # own names
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    @cached_property
+    def hashed_names(self):
+        return frozenset(self.hashed_files.values())
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = sorted(
+            name for name in {*self.hashed_files, *self.hashed_files.values()}
+            if name.endswith(COMPRESSED_EXTENSIONS)
+        )
+        with ThreadPoolExecutor(settings.STATIC_COMPRESS_WORKERS) as pool:
+            for name, variants in zip(names, pool.map(self.compress, names)):
+                for variant in variants:
+                    yield name, variant, True
+
+    def compress(self, name):
+        """Write the compressed variants of a file, return their names."""
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return []
+        variants = []
+        for suffix, compress in get_compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * COMPRESS_MAX_RATIO:
+                continue
+            variant = name + suffix
+            if self.exists(variant):
+                self.delete(variant)
+            variants.append(self._save(variant, ContentFile(compressed)))
+        return variants
+
+
+def accepts_encoding(header, coding):
+    """Whether an Accept-Encoding header accepts a content coding."""
+    for item in header.split(','):
+        token, *params = [part.strip() for part in item.split(';')]
+        if token.lower() not in (coding, '*'):
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def serve_static(request, path):
+    full_path, stat_result = get_file_path(settings.STATIC_ROOT, path)
+    content_type = get_content_type(path)
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    coding = None
+    for variant_coding, suffix in COMPRESSED_VARIANTS:
+        if not accepts_encoding(accept_encoding, variant_coding):
+            continue
+        try:
+            variant_stat = os.stat(full_path + suffix)
+        except OSError:
+            continue
+        full_path, stat_result = full_path + suffix, variant_stat
+        coding = variant_coding
+        break
+    response = serve_file(
+        request, full_path, stat_result,
+        # Every variant has its own validator
+        etag=get_etag(full_path, stat_result),
+        immutable=path in getattr(
+            staticfiles_storage, 'hashed_names', frozenset()
+        ),
+        max_age=settings.STATIC_CACHE_MAX_AGE,
+        content_type=content_type,
+    )
+    if coding is not None:
+        response['Content-Encoding'] = coding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,78 @@
+"""
+Content-addressed storage of uploaded media.
+
+A file is stored under the SHA-256 of its content, sharded by the first
+hex digits, e.g. ``blog_images/3f/a2/3fa2...e1.jpg``. The digest is
+computed while the upload is streamed to a temporary file, which is then
+moved in place, so identical uploads share one file and names never
+collide. Storing an existing file again refreshes its modification time.
+Files are shared between posts, see blog.image_processing for their
+release.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_RE = re.compile(
+    r'(?:^|/)(?P<digest>[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64})\.[\w.]+$'
+)
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the hash of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed
+        return name
+
+    def get_hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        match = HASHED_NAME_RE.search(name)
+        if match:
+            # Derived from a stored file, e.g. a rendition: same directory
+            directory = name[:match.start('digest')].rstrip('/')
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        digest = hashlib.sha256()
+        # Same file system as the target, so the final move is atomic
+        fd, temp_path = tempfile.mkstemp(dir=self.location, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            name = self.get_hashed_name(name, digest.hexdigest())
+            path = self.path(name)
+            try:
+                # Already stored: keep the existing file, touched so that
+                # it isn't released under the new upload
+                os.utime(path)
+                return name
+            except FileNotFoundError:
+                pass
+            os.makedirs(
+                os.path.dirname(path),
+                self.directory_permissions_mode or 0o777, exist_ok=True
+            )
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html
+
+from blog.cache import render_post_cards
+from blog.holes import render_hole
+from blog.images import get_current_renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Render post cards through the versioned fragment cache."""
+    return render_post_cards(posts)
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """Render a user-specific fragment, or its marker on shared pages."""
+    return render_hole(context['request'], name, *args)
+
+
+@register.simple_tag
+def post_image(post, sizes='100vw', css_class=''):
+    """
+    Lazily loaded ``<picture>`` of a post image with WebP and JPEG srcsets.
+
+    Until the renditions exist the original image is used.
+    """
+    image = post.image
+    if not image:
+        return ''
+    renditions = get_current_renditions(post)
+    if not renditions:
+        return format_html(
+            '<img class="{}" src="{}" alt="" loading="lazy" decoding="async">',
+            css_class, image.url
+        )
+    srcsets = {
+        image_format: ', '.join(
+            f'{image.storage.url(name)} {width}w' for width, name in sources
+        )
+        for image_format, sources in renditions.items()
+    }
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" alt=""'
+        ' loading="lazy" decoding="async"></picture>',
+        srcsets['webp'], sizes, css_class,
+        image.storage.url(renditions['jpeg'][-1][1]), srcsets['jpeg'], sizes
+    )
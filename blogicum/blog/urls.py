@@ -9,8 +9,11 @@ urlpatterns = [
     path("", views.PostList.as_view(), name="index"),
     path("posts/<int:post_id>/", views.PostDetail.as_view(),
          name="post_detail"),
+    path("search/", views.PostSearch.as_view(), name="search"),
 
     # Comment-related routes
+    path('posts/<int:post_id>/comments/', views.CommentList.as_view(),
+         name="comments_page"),
     path('posts/<int:post_id>/comment/', views.CommentCreate.as_view(),
          name="add_comment"),
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
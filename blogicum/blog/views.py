@@ -3,21 +3,49 @@ from django.core.paginator import Paginator
 from django.urls import reverse_lazy
 from django.http import Http404, HttpResponseRedirect
 from django.utils import timezone
+from django.db import transaction
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 )
 
 from .models import Post, Category, User, Comment
 from .forms import PostCreateForm, CommentCreateForm
-from django.db.models import Count
+from .pagination import CursorPaginator, InvalidCursor
+from .search import SearchCursorPaginator, search_posts
+from .cache import (
+    SharedPageCacheMixin, get_cached_post, user_has_hidden_posts
+)
+from .conditional import ConditionalGetMixin
+from .visibility import posts_stamp
+from .writes import run_write, save_comment
+from django.db.models import Count, Max, Q
 
 
 class PaginatorMixin:
-    """Mixin for adding pagination to views."""
+    """Mixin for adding numbered or ``?cursor=`` keyset pagination."""
 
     paginate_by = 10
+    cursor_kwarg = 'cursor'
+    cursor_paginator_class = CursorPaginator
+
+    def is_cursor_mode(self):
+        return self.cursor_kwarg in self.request.GET
+
+    def get_cursor_page(self, queryset, page_size):
+        paginator = self.cursor_paginator_class(queryset, page_size)
+        try:
+            page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Неверный курсор пагинации.")
+        return paginator, page
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.is_cursor_mode():
+            return super().paginate_queryset(queryset, page_size)
+        paginator, page = self.get_cursor_page(queryset, page_size)
+        return paginator, page, page.object_list, page.has_other_pages()
 
 
 class PostMixin:
@@ -32,53 +60,137 @@ class PostFormMixin:
     form_class = PostCreateForm
 
 
-class PostList(PaginatorMixin, PostMixin, ListView):
+class FeedPageMixin(SharedPageCacheMixin, ConditionalGetMixin):
+    """Mixin for cached feeds validated by the count of their posts."""
+
+    feed_count = None
+
+    def is_page_shared(self, request):
+        return not user_has_hidden_posts(request.user)
+
+    def get_validators(self):
+        self.feed_count, last_modified = posts_stamp(self.get_queryset())
+        return (self.feed_count, last_modified), None
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        if self.feed_count is not None:
+            # Already known from the validators, skip the COUNT(*)
+            paginator.count = self.feed_count
+        return paginator
+
+
+class PostList(FeedPageMixin, PaginatorMixin, PostMixin, ListView):
     """View for listing published posts."""
 
     template_name = 'blog/index.html'
     def get_queryset(self):
         return Post.get_published_posts(user=self.request.user)
 
-class PostDetail(CreateView):
+class VisiblePostMixin:
+    """Mixin for views showing a single post to the current user."""
+
+    @staticmethod
+    def is_public(post):
+        return (
+            post.pub_date <= timezone.now() and post.is_published
+            and post.category.is_published
+        )
+
+    def get_post(self):
+        post = get_cached_post(self.kwargs.get('post_id'))
+        if post is None:
+            raise Http404("Публикация не найдена.")
+        # Check if the post should be visible to the current user
+        if not self.is_public(post) and post.author != self.request.user:
+            raise Http404("Публикация не найдена.")
+
+        return post
+
+
+class CommentPageMixin:
+    """Mixin for keyset pagination of the comments of a post."""
+
+    comments_paginate_by = 50
+    comments_cursor_kwarg = 'comments'
+
+    def get_comments_page(self, post):
+        paginator = CursorPaginator(
+            post.comments.select_related('author'),
+            self.comments_paginate_by,
+            ordering=('created_at', 'id'),
+        )
+        try:
+            return paginator.get_page(
+                self.request.GET.get(self.comments_cursor_kwarg)
+            )
+        except InvalidCursor:
+            raise Http404("Неверный курсор пагинации.")
+
+
+class PostDetail(
+    SharedPageCacheMixin, ConditionalGetMixin, VisiblePostMixin,
+    CommentPageMixin, CreateView
+):
     """View for displaying post details and adding comments."""
 
     form_class = CommentCreateForm
     template_name = 'blog/detail.html'
 
+    def is_page_shared(self, request):
+        # The author of a hidden post sees it with a warning, nobody else
+        post = get_cached_post(self.kwargs.get('post_id'))
+        return post is not None and self.is_public(post)
+
+    def get_validators(self):
+        # Adding, editing or deleting a comment moves post.updated_at too.
+        # Category and location changes only move the page cache generation
+        # in the ETag, so there is no Last-Modified
+        post = self.get_post()
+        return (
+            (post.pk, post.updated_at, post.comment_count,
+             post.author.username),
+            None,
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         post = self.get_post()
         context['post'] = post
-        context['comments'] = post.comments.all()
+        context['comments'] = self.get_comments_page(post)
         return context
 
-    def get_post(self):
-        post_id = self.kwargs.get('post_id')
-        post = get_object_or_404(Post, id=post_id)
-        # Check if the post should be visible to the current user
-        if (
-            (post.pub_date > timezone.now() or not post.is_published
-             or not post.category.is_published)
-            and post.author != self.request.user
-        ):
-            raise Http404("Публикация не найдена.")
 
-        return post
+class CommentList(VisiblePostMixin, CommentPageMixin, TemplateView):
+    """HTML fragment with the next page of comments of a post."""
 
+    template_name = 'includes/comment_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        post = self.get_post()
+        context['post'] = post
+        context['comments'] = self.get_comments_page(post)
+        return context
 
 
-class CategoryList(PaginatorMixin, PostMixin, ListView):
+class CategoryList(FeedPageMixin, PaginatorMixin, PostMixin, ListView):
     """View for listing posts in a specific category."""
 
     template_name = 'blog/index.html'
 
-    def get_queryset(self):
-        self.category = get_object_or_404(
-            Category, slug=self.kwargs['category_slug']
-        )
+    def get_category(self):
+        if not hasattr(self, 'category'):
+            self.category = get_object_or_404(
+                Category, slug=self.kwargs['category_slug']
+            )
         if not self.category.is_published:
             # Don't show posts from unpublished categories
             raise Http404("Category is not published.")
+        return self.category
+
+    def get_queryset(self):
+        self.get_category()
         return Post.get_published_posts(n=None, user=self.request.user, queryset=self.category.posts)
 
     def get_context_data(self, **kwargs):
@@ -87,6 +199,32 @@ class CategoryList(PaginatorMixin, PostMixin, ListView):
         return context
 
 
+class PostSearch(PaginatorMixin, PostMixin, ListView):
+    """View for full-text search over the posts visible to the user."""
+
+    template_name = 'blog/search.html'
+    cursor_paginator_class = SearchCursorPaginator
+    query_kwarg = 'q'
+
+    def get_query(self):
+        return self.request.GET.get(self.query_kwarg, '').strip()
+
+    def is_cursor_mode(self):
+        # Ranked results have no stable numbering, always seek by rank
+        return True
+
+    def get_queryset(self):
+        return Post.get_published_posts(
+            user=self.request.user,
+            queryset=search_posts(Post.objects.all(), self.get_query())
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.get_query()
+        return context
+
+
 class PostCreate(LoginRequiredMixin, PostMixin, PostFormMixin, CreateView):
     """View for creating a new post."""
 
@@ -95,8 +233,8 @@ class PostCreate(LoginRequiredMixin, PostMixin, PostFormMixin, CreateView):
     def form_valid(self, form):
         # Set the author of the post to the current user
         form.instance.author = self.request.user
-        form.save()
-        return super().form_valid(form)
+        self.object = run_write(form.save)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         # Redirect to the user's profile page after creating a post
@@ -104,39 +242,64 @@ class PostCreate(LoginRequiredMixin, PostMixin, PostFormMixin, CreateView):
         return reverse_lazy('blog:profile', kwargs={'username': username})
 
 
-class PostUpdate(LoginRequiredMixin, PostMixin, PostFormMixin, UpdateView):
+class OwnerObjectMixin:
+    """Mixin loading the object of an edit/delete view once, for its owner."""
+
+    owner_field = 'author'
+    not_owner_message = "You do not have permission to edit this object."
+
+    def dispatch(self, request, *args, **kwargs):
+        self.object = self.get_owned_object()
+        if self.object is None:
+            return self.handle_not_owner()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_object(self, queryset=None):
+        if getattr(self, 'object', None) is not None:
+            return self.object
+        return super().get_object(queryset)
+
+    def get_owned_object(self):
+        queryset = self.get_queryset()
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if self.request.user.is_authenticated:
+            obj = queryset.filter(
+                pk=pk, **{self.owner_field: self.request.user}
+            ).first()
+            if obj is not None:
+                return obj
+        get_object_or_404(queryset, pk=pk)
+        return None
+
+    def handle_not_owner(self):
+        raise PermissionDenied(self.not_owner_message)
+
+
+class PostUpdate(
+    OwnerObjectMixin, LoginRequiredMixin, PostMixin, PostFormMixin,
+    UpdateView
+):
     """View for updating an existing post."""
 
     success_url = reverse_lazy('blog:index')
     pk_url_kwarg = 'post_id'
 
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        if post.author != request.user:
-            # Redirect if the user is not the author of the post
-            return HttpResponseRedirect(
-                reverse_lazy(
-                    'blog:post_detail',
-                    kwargs={'post_id': post.id}
-                )
+    def handle_not_owner(self):
+        # Redirect if the user is not the author of the post
+        return HttpResponseRedirect(
+            reverse_lazy(
+                'blog:post_detail',
+                kwargs={'post_id': self.kwargs['post_id']}
             )
-        return super().dispatch(request, *args, **kwargs)
+        )
 
 
-class PostDelete(LoginRequiredMixin, PostMixin, DeleteView):
+class PostDelete(OwnerObjectMixin, LoginRequiredMixin, PostMixin, DeleteView):
     """View for deleting a post."""
 
     pk_url_kwarg = 'post_id'
     template_name = 'blog/create.html'
-
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        if post.author != request.user:
-            # Prevent deletion if the user is not the author
-            raise PermissionDenied(
-                "You do not have permission to delete this post."
-            )
-        return super().dispatch(request, *args, **kwargs)
+    not_owner_message = "You do not have permission to delete this post."
 
     def get_success_url(self):
         # Redirect to the user's profile page after deleting a post
@@ -160,25 +323,43 @@ class ProfilePage(UserByUsernameMixin, PaginatorMixin, LoginRequiredMixin, Detai
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = get_object_or_404(User, username=self.kwargs['username'])
-        context['profile'] = user
-        user_posts = Post.get_published_posts(user=self.request.user, queryset=user.posts)
-        page_obj = self.paginate_user_posts(user_posts)
-        context['page_obj'] = page_obj
+        profile = self.object
+        context['profile'] = profile
+        stats = self.get_profile_stats(profile)
+        context['profile_stats'] = stats
+        user_posts = Post.get_published_posts(
+            user=self.request.user, queryset=profile.posts
+        )
+        # The owner sees all of their posts, everybody else the published
+        count = (
+            stats['total_count'] if self.request.user == profile
+            else stats['post_count']
+        )
+        context['page_obj'] = self.paginate_user_posts(user_posts, count)
         context['user'] = self.request.user
         return context
 
-    def get_user_posts(self, user):
-        """Retrieve and filter user posts based on publication status."""
-        user_posts = user.posts.all()
-        user_posts = user_posts.prefetch_related('comments').annotate(comment_count=Count('comments')).order_by(*Post._meta.ordering)
-        if self.request.user != user:  # If the request user is not the profile owner
-            user_posts = user_posts.filter(is_published=True)  # Show only published posts
-        return user_posts
+    def get_profile_stats(self, profile):
+        """Post counters and last publication date in one aggregate query."""
+        published = Q(
+            is_published=True,
+            pub_date__lte=timezone.now(),
+            category__is_published=True
+        )
+        return profile.posts.aggregate(
+            total_count=Count('id'),
+            post_count=Count('id', filter=published),
+            last_pub_date=Max('pub_date', filter=published),
+        )
 
-    def paginate_user_posts(self, user_posts):
+    def paginate_user_posts(self, user_posts, count=None):
         """Paginate the user's posts."""
+        if self.is_cursor_mode():
+            return self.get_cursor_page(user_posts, self.paginate_by)[1]
         paginator = Paginator(user_posts, self.paginate_by)
+        if count is not None:
+            # Already known from the stats query, skip the COUNT(*)
+            paginator.count = count
         page_number = self.request.GET.get('page')
         return paginator.get_page(page_number)
 
@@ -244,7 +425,7 @@ class CommentCreate(LoginRequiredMixin, CommentFormMixin, CreateView):
         post_id = self.kwargs.get('post_id')
         post = get_object_or_404(Post, id=post_id)
         comment.post = post
-        comment.save()
+        save_comment(comment)
         # Redirect to the post detail page after creating a comment
         return HttpResponseRedirect(
             reverse_lazy('blog:post_detail', kwargs={'post_id': post.id})
@@ -252,36 +433,26 @@ class CommentCreate(LoginRequiredMixin, CommentFormMixin, CreateView):
 
 
 class CommentUpdate(
-    LoginRequiredMixin, CommentIdMixin, CommentMixin,
+    OwnerObjectMixin, LoginRequiredMixin, CommentIdMixin, CommentMixin,
     CommentFormMixin, BackToPostMixin, UpdateView
 ):
     """View for updating an existing comment."""
 
     template_name = 'blog/comment.html'
+    not_owner_message = "You do not have permission to edit this comment."
 
-    def dispatch(self, request, *args, **kwargs):
-        comment = self.get_object()
-        if comment.author != request.user:
-            # Prevent editing if the user is not the comment author
-            raise PermissionDenied(
-                "You do not have permission to edit this comment."
-            )
-        return super().dispatch(request, *args, **kwargs)
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            Post.touch(self.object.post_id)
+        return response
 
 
 class CommentDelete(
-    LoginRequiredMixin, CommentMixin, CommentIdMixin,
+    OwnerObjectMixin, LoginRequiredMixin, CommentMixin, CommentIdMixin,
     BackToPostMixin, DeleteView
 ):
     """View for deleting a comment."""
 
     template_name = 'blog/comment.html'
-
-    def dispatch(self, request, *args, **kwargs):
-        comment = self.get_object()
-        if comment.author != request.user:
-            # Prevent deletion if the user is not the comment author
-            raise PermissionDenied(
-                "You do not have permission to delete this comment."
-            )
-        return super().dispatch(request, *args, **kwargs)
+    not_owner_message = "You do not have permission to delete this comment."
@@ -0,0 +1,92 @@
+from django.db.models import Count, Max, Q, QuerySet
+from django.utils import timezone
+
+
+class PostVisibility:
+    """
+    Builds the posts visible to a user as index-seekable branches.
+
+    ``Q(author=user) | published`` spans a JOIN, so SQLite can't serve it
+    from a single index and sorts the whole feed. Instead the user's own
+    posts and everybody else's published posts are selected separately and
+    merged with ``UNION ALL``. The branches are disjoint, so no row has to
+    be de-duplicated and SQLite merges two index-ordered scans.
+    """
+
+    def __init__(self, queryset, user=None, now=None):
+        self.queryset = queryset.order_by()
+        self.user = user
+        self.now = now or timezone.now()
+
+    def published(self):
+        return self.queryset.filter(
+            pub_date__lte=self.now,
+            is_published=True,
+            category__is_published=True
+        )
+
+    def hidden(self):
+        """The user's own posts nobody else can see."""
+        return self.queryset.filter(author=self.user).filter(
+            Q(pub_date__gt=self.now)
+            | Q(is_published=False)
+            | Q(category__is_published=False)
+        )
+
+    def branches(self):
+        if self.user is None or not self.user.is_authenticated:
+            return [self.published()]
+        return [
+            self.queryset.filter(author=self.user),
+            self.published().exclude(author=self.user),
+        ]
+
+    def as_queryset(self):
+        first, *rest = self.branches()
+        return first.union(*rest, all=True) if rest else first
+
+
+def filter_posts(queryset, *args, **kwargs):
+    """Filter a plain queryset or each branch of a PostVisibility union."""
+    query = queryset.query
+    if not query.combinator:
+        return queryset.filter(*args, **kwargs)
+    first, *rest = (
+        QuerySet(model=queryset.model, query=branch.chain())
+        .filter(*args, **kwargs)
+        for branch in query.combined_queries
+    )
+    return first.union(*rest, all=query.combinator_all).order_by(
+        *query.order_by
+    )
+
+
+def posts_stamp(queryset):
+    """
+    Number of posts and the time of their last change or publication.
+
+    Both come from aggregates, no post row is fetched. Each branch of a
+    PostVisibility union is aggregated on its own, as an aggregate over the
+    union itself can't use the branches' indexes.
+    """
+    query = queryset.query
+    branches = [queryset] if not query.combinator else [
+        QuerySet(model=queryset.model, query=branch.chain())
+        for branch in query.combined_queries
+    ]
+    stats = [
+        branch.order_by().aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at'),
+            pub_date=Max('pub_date'),
+        )
+        for branch in branches
+    ]
+    changed = [
+        row[name] for row in stats for name in ('updated_at', 'pub_date')
+        if row[name] is not None
+    ]
+    return (
+        sum(row['count'] for row in stats),
+        max(changed) if changed else None,
+    )
@@ -0,0 +1,150 @@
+"""
+Write path for SQLite, which has a single writer lock.
+
+``run_write`` runs a write in its own transaction and retries it with
+jittered exponential backoff while the database is locked. With
+COMMENT_WRITE_QUEUE new comments go through ``comment_writer`` instead: one
+thread of the process saves the queued comments in batches, a single
+transaction per batch. A batch failing for another reason than the lock is
+saved again comment by comment, so only the faulty comments fail.
+"""
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+from .routers import note_write
+
+
+def is_locked_error(error):
+    # "database is locked", or "database table is locked" with shared cache
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def get_backoff_delay(attempt):
+    """Seconds to wait before retry ``attempt``: full jitter backoff."""
+    ceiling = min(
+        settings.WRITE_RETRY_MAX_DELAY,
+        settings.WRITE_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+    )
+    return random.uniform(0, ceiling)
+
+
+def run_write(write, using=None):
+    """
+    Run ``write()`` in a transaction, retrying while the database is locked.
+
+    Inside an outer transaction ``write`` runs once: a locked error has
+    already broken the outer transaction, so only its owner can retry.
+    """
+    if transaction.get_connection(using).in_atomic_block:
+        return write()
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic(using=using):
+                return write()
+        except OperationalError as error:
+            attempt += 1
+            if (
+                not is_locked_error(error)
+                or attempt >= settings.WRITE_RETRY_ATTEMPTS
+            ):
+                raise
+        time.sleep(get_backoff_delay(attempt))
+
+
+def save_comments(comments):
+    """Save new comments, their posts' counters move along (blog.signals)."""
+    for comment in comments:
+        # A retried batch starts over, forget ids of a rolled back attempt
+        comment.pk = None
+        comment.save()
+    return comments
+
+
+class CommentWriter:
+    """In-process writer thread saving queued comments in batches."""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.batches = 0
+
+    def submit(self, comment):
+        """Queue a new comment; the returned future resolves once saved."""
+        future = Future()
+        self.queue.put((comment, future))
+        self.ensure_started()
+        return future
+
+    def save(self, comment):
+        return self.submit(comment).result(
+            timeout=settings.COMMENT_WRITE_TIMEOUT
+        )
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='comment-writer', daemon=True
+                )
+                self.thread.start()
+
+    def get_batch(self):
+        batch_size = self.batch_size or settings.COMMENT_WRITE_BATCH_SIZE
+        batch = [self.queue.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.get_batch()
+            close_old_connections()
+            try:
+                run_write(lambda: save_comments(
+                    [comment for comment, future in batch]
+                ))
+            except Exception as error:
+                if len(batch) > 1 and not is_locked_error(error):
+                    # One invalid comment must not fail the whole batch
+                    self.save_each(batch)
+                else:
+                    for comment, future in batch:
+                        future.set_exception(error)
+            else:
+                for comment, future in batch:
+                    future.set_result(comment)
+            self.batches += 1
+
+    def save_each(self, batch):
+        for comment, future in batch:
+            try:
+                run_write(partial(save_comments, [comment]))
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(comment)
+
+
+comment_writer = CommentWriter()
+
+
+def save_comment(comment):
+    """Save a new comment through the writer queue or a retried write."""
+    if settings.COMMENT_WRITE_QUEUE:
+        # Saved by the writer thread, outside of the request's routing
+        note_write()
+        return comment_writer.save(comment)
+    return run_write(lambda: save_comments([comment]))[0]
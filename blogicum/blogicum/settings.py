@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.RequestProfilingMiddleware',
+    'blog.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,8 +84,98 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Its migration creates the cache table, so in tests the cache
+        # database must exist first
+        'TEST': {'DEPENDENCIES': ['cache']},
+    },
+    # Holds the cache table only, see CACHES
+    'cache': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'cache.sqlite3',
+        'TEST': {'DEPENDENCIES': []},
+    },
+}
+
+# Aliases of read replicas of the default database. To try them locally
+# add e.g. 'replica': {'ENGINE': ..., 'NAME': BASE_DIR / 'replica.sqlite3'}
+# to DATABASES, list it here and run `manage.py copy_to_replicas` to
+# "replicate" the primary
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# After a write the user reads from the primary for this many seconds,
+# remembered in a cookie
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+# PRAGMAs run on every new SQLite connection (see blog.sqlite): WAL lets
+# readers go on while a transaction writes, busy_timeout (ms) makes writers
+# wait for each other instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Writes hitting "database is locked" are retried up to WRITE_RETRY_ATTEMPTS
+# times, waiting a random time up to BASE_DELAY * 2 ** retry (at most
+# MAX_DELAY) seconds in between
+WRITE_RETRY_ATTEMPTS = 5
+WRITE_RETRY_BASE_DELAY = 0.05
+WRITE_RETRY_MAX_DELAY = 1.0
+
+# Save new comments through one writer thread per process, which writes
+# up to COMMENT_WRITE_BATCH_SIZE queued comments in a single transaction;
+# requests wait at most COMMENT_WRITE_TIMEOUT seconds for their comment
+COMMENT_WRITE_QUEUE = False
+COMMENT_WRITE_BATCH_SIZE = 50
+COMMENT_WRITE_TIMEOUT = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# Shared by every worker process and the management commands, so an
+# invalidation made by any of them reaches all. The table lives in its own
+# SQLite file (the CACHE_DATABASE alias), apart from the primary's single
+# writer lock, and is created by `manage.py migrate`. Counters moved with
+# incr() are approximate: the database cache reads and writes them apart.
+# Across several hosts use Memcached
+# ('django.core.cache.backends.memcached.PyMemcacheCache').
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'blog_cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
     }
 }
+CACHE_DATABASE = 'cache'
+
+# Seconds an anonymous page stays cached; 0 disables the page cache
+PAGE_CACHE_TIMEOUT = 60
+
+# Read-through cache of single posts; unknown ids are remembered briefly
+POST_CACHE_TIMEOUT = 60 * 60
+POST_NEGATIVE_CACHE_TIMEOUT = 60
+
+# Seconds an expired entry may still be served while one worker refreshes it
+CACHE_STALE_TIMEOUT = 30
+
+# Seconds a worker may hold the recompute lock of a cache entry
+CACHE_LOCK_TIMEOUT = 5
+
+# Rendered post cards are versioned by their content, so they may live long
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Request profiling: share of requests that get a Server-Timing header
+# and, with REQUEST_PROFILING_LOG, a JSON line in the blog.profiling logger.
+# Off by default: the header exposes query and render times to any client
+REQUEST_PROFILING_SAMPLE_RATE = 0
+REQUEST_PROFILING_LOG = False
 
 
 # Password validation
@@ -126,9 +218,40 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+STATIC_ROOT = BASE_DIR / 'static_root'
+# Hashed file names and .gz/.br variants (.br needs the brotli package
+# from requirements.txt), compressed by STATIC_COMPRESS_WORKERS threads in collectstatic
+STATICFILES_STORAGE = (
+    'blog.staticfiles.CompressedManifestStaticFilesStorage'
+)
+STATIC_COMPRESS_WORKERS = 4
+# Browser cache lifetime (seconds) of static files without a hashed name
+STATIC_CACHE_MAX_AGE = 60 * 60
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
-MEDIA_ROOT = BASE_DIR
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = '/media/'
+# Media files are sent by the front server when set: 'X-Accel-Redirect'
+# (nginx, from the internal MEDIA_ACCEL_PREFIX location aliased to
+# MEDIA_ROOT) or 'X-Sendfile' (Apache, lighttpd); by Django otherwise
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Browser cache lifetime (seconds) of media files not named by their hash
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# Uploads are stored once per content, under their SHA-256
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'
+# Seconds a stored file no post uses is kept, in case an identical upload
+# is about to use it; `manage.py delete_orphan_media` deletes it later
+MEDIA_RELEASE_GRACE = 60 * 60
+
+# Widths (px) of the JPEG and WebP copies made of every post image
+POST_IMAGE_WIDTHS = (320, 640, 1280)
+
+# Where new post images are processed once saved: 'pool' in
+# POST_IMAGE_WORKERS worker processes, off the request thread, 'sync' in
+# the thread that saved the post
+POST_IMAGE_PROCESSING = 'pool'
+POST_IMAGE_WORKERS = 2
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
@@ -16,10 +16,12 @@ Including another URLconf
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path, reverse_lazy
-from django.conf.urls.static import static
 
 from django.contrib.auth.forms import UserCreationForm
 from django.views.generic.edit import CreateView
+
+from blog.media import serve_media
+from blog.staticfiles import serve_static
 # from pages.views import page_not_found, custom_500_view
 
 
@@ -36,7 +38,11 @@ urlpatterns = [
          ),
          name='registration',
          ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media,
+         name='media'),
+    path(f'{settings.STATIC_URL.lstrip("/")}<path:path>', serve_static,
+         name='static'),
+]
 
 handler500 = "pages.views.custom_500_view"
 handler404 = "pages.views.page_not_found"
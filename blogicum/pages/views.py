@@ -1,12 +1,21 @@
 from django.views.generic import TemplateView
 from django.shortcuts import render
 
+from blog.cache import SharedPageCacheMixin
 
-class AboutPageView(TemplateView):
+
+class StaticPageMixin(SharedPageCacheMixin):
+    """Mixin for pages that only vary by user in their header."""
+
+    def is_page_shared(self, request):
+        return True
+
+
+class AboutPageView(StaticPageMixin, TemplateView):
     template_name = 'pages/about.html'
 
 
-class RulesPageView(TemplateView):
+class RulesPageView(StaticPageMixin, TemplateView):
     template_name = 'pages/rules.html'
 
 
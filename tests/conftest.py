@@ -41,6 +41,30 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def local_cache():
+    # A single test process: the shared database cache would only add
+    # queries to those the tests count
+    with override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }}):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(local_cache):
+    from django.core.cache import cache
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def process_images_in_place(settings):
+    # Worker threads storing the results would contend for the in-memory
+    # test database; tests opt in to the pool explicitly
+    settings.POST_IMAGE_PROCESSING = 'sync'
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -363,6 +387,7 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
@@ -0,0 +1,76 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from blog.cache import get_post_card_stats, reset_post_card_stats
+from blog.models import Post
+
+pytestmark = [
+    pytest.mark.django_db,
+    # keep whole pages out of the way of the card cache
+    pytest.mark.usefixtures("no_page_cache"),
+]
+
+
+@pytest.fixture
+def no_page_cache():
+    with override_settings(PAGE_CACHE_TIMEOUT=0):
+        yield
+
+
+def test_cards_are_served_from_cache(
+        user_client, many_posts_with_published_locations
+):
+    reset_post_card_stats()
+    first = user_client.get("/").content
+    assert get_post_card_stats()["misses"] == 10
+    second = user_client.get("/").content
+    stats = get_post_card_stats()
+    assert stats["hits"] == 10 and stats["hit_rate"] == 0.5, (
+        "Убедитесь, что повторный рендер ленты берёт карточки публикаций"
+        " из кеша."
+    )
+    assert first == second
+
+
+def test_stats_command_reads_the_shared_cache(
+        user_client, many_posts_with_published_locations, tmp_path
+):
+    with pytest.raises(CommandError):
+        call_command("post_card_cache_stats")
+    with override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(tmp_path),
+    }}):
+        user_client.get("/")
+        out = StringIO()
+        call_command("post_card_cache_stats", "--reset", stdout=out)
+        assert "misses: 10" in out.getvalue(), (
+            "Убедитесь, что команда показывает счётчики общего кеша."
+        )
+        assert get_post_card_stats()["misses"] == 0
+
+
+def test_card_version_changes_with_dependencies(
+        user_client, post_with_published_location, published_location,
+        published_category, user
+):
+    post = post_with_published_location
+    user_client.get("/")
+    for instance, field, value in (
+        (post, "title", "Новое название"),
+        (published_category, "title", "Новая категория"),
+        (published_location, "name", "Новое место"),
+        (user, "username", "new_username"),
+    ):
+        setattr(instance, field, value)
+        instance.save()
+        assert value in user_client.get("/").content.decode("utf-8"), (
+            "Убедитесь, что карточка публикации перерисовывается после"
+            f" изменения модели `{type(instance).__name__}`."
+        )
+
+    Post.change_comment_count(post.id, 7)
+    assert "Комментарии (7)" in user_client.get("/").content.decode("utf-8")
@@ -0,0 +1,98 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_views_maintain_counter(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.post(f"/posts/{post.id}/comment/", {"text": "Комментарий"})
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что при создании комментария увеличивается"
+        " счётчик `comment_count` публикации."
+    )
+
+    # A stale in-memory copy must not overwrite the stored counter
+    stale = Post.objects.get(pk=post.pk)
+    user_client.post(f"/posts/{post.id}/comment/", {"text": "Ещё один"})
+    stale.title = "Новое название"
+    stale.save()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+    comment = Comment.objects.filter(post=post).first()
+    user_client.post(f"/posts/{post.id}/delete_comment/{comment.id}/")
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что при удалении комментария уменьшается"
+        " счётчик `comment_count` публикации."
+    )
+
+
+def test_every_comment_path_maintains_counter(
+        mixer, user, another_user, post_with_published_location
+):
+    post = post_with_published_location
+    # Saved and deleted outside of the views, e.g. in the admin
+    mixer.cycle(3).blend(Comment, post=post, author=user)
+    mixer.cycle(2).blend(Comment, post=post, author=another_user)
+    post.refresh_from_db()
+    assert post.comment_count == 5
+    Comment.objects.filter(post=post, author=user)[:1].get().delete()
+    post.refresh_from_db()
+    assert post.comment_count == 4
+    # Cascade of a removed account
+    another_user.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+    # Bulk delete
+    Comment.objects.filter(post=post).delete()
+    post.refresh_from_db()
+    assert post.comment_count == 0, (
+        "Убедитесь, что счётчик `comment_count` меняется при любом"
+        " создании и удалении комментариев."
+    )
+
+
+def test_deleted_post_skips_comment_counter(
+        mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend(Comment, post=post, author=user)
+    with CaptureQueriesContext(connection) as queries:
+        post.delete()
+    updates = [
+        query["sql"] for query in queries.captured_queries
+        if query["sql"].startswith("UPDATE")
+    ]
+    assert not updates, (
+        "Убедитесь, что при удалении публикации счётчик `comment_count`"
+        " не обновляется для каждого её комментария."
+    )
+    # The next deletion of a comment of another post still counts
+    other = mixer.blend(Post, author=user)
+    comment = mixer.blend(Comment, post=other, author=user)
+    comment.delete()
+    other.refresh_from_db()
+    assert other.comment_count == 0
+
+
+def test_reconcile_comment_counts(mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(3).blend(Comment, post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+
+    out = StringIO()
+    call_command("reconcile_comment_counts", chunk_size=1, stdout=out)
+    post.refresh_from_db()
+    assert post.comment_count == 3
+    assert "fixed 1" in out.getvalue()
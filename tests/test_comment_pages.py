@@ -0,0 +1,58 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.views import CommentPageMixin
+
+pytestmark = [pytest.mark.django_db]
+
+PER_PAGE = CommentPageMixin.comments_paginate_by
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(PER_PAGE + 5).blend(
+        "blog.Comment", post=post_with_published_location
+    )
+
+
+def test_detail_shows_first_comment_page(
+        user_client, post_with_published_location, many_comments,
+        django_assert_max_num_queries
+):
+    post = post_with_published_location
+    # post, category, location, session, user, comments with authors
+    with django_assert_max_num_queries(7):
+        response = user_client.get(f"/posts/{post.id}/")
+    page = response.context["comments"]
+    assert [c.id for c in page] == [c.id for c in many_comments[:PER_PAGE]], (
+        "Убедитесь, что на странице публикации выводится первая страница"
+        " комментариев, от старых к новым."
+    )
+    assert page.has_next()
+
+
+def test_comment_fragment_returns_next_page(
+        user_client, post_with_published_location, many_comments
+):
+    post = post_with_published_location
+    first = user_client.get(f"/posts/{post.id}/").context["comments"]
+    response = user_client.get(
+        f"/posts/{post.id}/comments/", {"comments": first.next_cursor}
+    )
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode("utf-8")
+    assert "<html" not in content
+    page = response.context["comments"]
+    assert [c.id for c in page] == [c.id for c in many_comments[PER_PAGE:]]
+    assert not page.has_next()
+
+
+def test_comment_fragment_of_hidden_post(
+        another_user_client, post_with_published_location, many_comments
+):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    response = another_user_client.get(f"/posts/{post.id}/comments/")
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,182 @@
+import json
+import time
+
+import pytest
+from django.core import serializers
+from django.http import HttpResponse
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from django.views import View
+
+from blog.conditional import ConditionalGetMixin
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _get_again(client, url, response, **headers):
+    return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+
+
+@pytest.mark.parametrize("url_template", [
+    "/",
+    "/category/{category}/",
+    "/posts/{post}/",
+])
+@pytest.mark.parametrize("client_name", ["client", "user_client"])
+def test_unchanged_page_not_modified(
+        request, client_name, url_template, post_with_published_location
+):
+    client = request.getfixturevalue(client_name)
+    post = post_with_published_location
+    url = url_template.format(category=post.category.slug, post=post.id)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "ETag" in response, (
+        f"Убедитесь, что страница `{url}` отдаёт заголовок `ETag`."
+    )
+    assert _get_again(client, url, response).status_code == 304, (
+        f"Убедитесь, что страница `{url}` отвечает 304 на запрос"
+        " с совпадающим `If-None-Match`."
+    )
+
+
+def test_post_page_has_no_last_modified(
+        user_client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    assert "Last-Modified" not in response, (
+        "Убедитесь, что страница публикации не отдаёт заголовок"
+        " `Last-Modified`: изменение категории или местоположения"
+        " не меняет время изменения публикации."
+    )
+    category = post_with_published_location.category
+    category.title = "Новое название"
+    category.save()
+    changed = user_client.get(
+        url, HTTP_IF_NONE_MATCH=response["ETag"],
+        HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+    )
+    assert changed.status_code == 200
+    assert "Новое название" in changed.content.decode()
+
+
+def test_feed_has_no_last_modified(client, post_with_published_location):
+    response = client.get("/")
+    assert "Last-Modified" not in response, (
+        "Убедитесь, что лента не отдаёт заголовок `Last-Modified`:"
+        " удаление публикации не меняет время изменения остальных."
+    )
+    # Hiding a post moves the time of no post left in the feed
+    category = post_with_published_location.category
+    category.is_published = False
+    category.save()
+    changed = client.get(
+        "/", HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+    )
+    assert changed.status_code == 200
+    assert len(changed.context["page_obj"]) == 0
+
+
+def test_not_modified_without_rendering(
+        user_client, django_assert_num_queries, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    with django_assert_num_queries(2):
+        not_modified = _get_again(user_client, url, response)
+    assert not_modified.status_code == 304
+    assert not not_modified.content
+
+
+def test_post_change_updates_validators(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = user_client.get(url)
+    post.title = "Новый заголовок"
+    post.save()
+    changed = _get_again(user_client, url, response)
+    assert changed.status_code == 200
+    assert changed["ETag"] != response["ETag"]
+
+
+def test_comment_changes_update_validators(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = user_client.get(url)
+    user_client.post(f"/posts/{post.id}/comment/", {"text": "Первый"})
+    after_create = _get_again(user_client, url, response)
+    assert after_create.status_code == 200, (
+        "Убедитесь, что после добавления комментария страница публикации"
+        " не отвечает 304."
+    )
+    comment = post.comments.get()
+    user_client.post(
+        f"/posts/{post.id}/edit_comment/{comment.id}/", {"text": "Второй"}
+    )
+    after_edit = _get_again(user_client, url, after_create)
+    assert after_edit.status_code == 200, (
+        "Убедитесь, что после изменения комментария страница публикации"
+        " не отвечает 304."
+    )
+    assert "Второй" in after_edit.content.decode()
+
+
+def test_feed_validators_depend_on_user(
+        user_client, another_user_client, post_with_published_location
+):
+    response = user_client.get("/")
+    assert _get_again(another_user_client, "/", response).status_code == 200
+
+
+# Cached pages only notice scheduled posts after PAGE_CACHE_TIMEOUT
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def test_scheduled_post_publication_changes_feed_validators(
+        another_user_client, post_with_published_location
+):
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() + timezone.timedelta(days=1)
+    )
+    response = another_user_client.get("/")
+    # The post becomes visible with time, without being saved
+    Post.objects.filter(pk=post.pk).update(pub_date=timezone.now())
+    changed = _get_again(another_user_client, "/", response)
+    assert changed.status_code == 200, (
+        "Убедитесь, что главная страница не отвечает 304 после того,"
+        " как наступила дата отложенной публикации."
+    )
+    assert len(changed.context["page_obj"]) == 1
+
+
+def test_fixture_without_updated_at_loads(post_with_published_location):
+    [record] = json.loads(
+        serializers.serialize("json", [post_with_published_location])
+    )
+    record["pk"] = None
+    del record["fields"]["updated_at"]
+    # A raw save, as made by loaddata
+    [loaded] = serializers.deserialize("json", json.dumps([record]))
+    loaded.save()
+    assert loaded.object.updated_at is not None, (
+        "Убедитесь, что фикстуры без поля `updated_at` загружаются."
+    )
+
+
+def test_mixin_without_validators(rf, user):
+    class Page(ConditionalGetMixin, View):
+        def get(self, request):
+            return HttpResponse("Страница")
+
+    request = rf.get("/")
+    request.user = user
+    response = Page.as_view()(request)
+    assert response.status_code == 200
+    assert "ETag" not in response
+    assert "Last-Modified" not in response
@@ -0,0 +1,69 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core import serializers
+from django.core.management import call_command
+from django.template.defaultfilters import truncatewords
+from django.utils.html import escape
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_excerpt_computed_on_save(post_with_published_location):
+    post = post_with_published_location
+    post.text = " ".join(f"слово{i}" for i in range(50))
+    post.save()
+    post.refresh_from_db()
+    assert post.excerpt == truncatewords(post.text, 10), (
+        "Убедитесь, что при сохранении публикации поле `excerpt` содержит"
+        " первые 10 слов текста."
+    )
+
+
+def test_feed_does_not_load_text(
+        client, many_posts_with_published_locations
+):
+    queryset = Post.get_published_posts()
+    assert '"blog_post"."text"' not in str(queryset.query), (
+        "Убедитесь, что запросы ленты не загружают полный текст публикаций."
+    )
+    response = client.get("/")
+    post = response.context["page_obj"][0]
+    assert escape(post.excerpt) in response.content.decode("utf-8")
+
+
+def test_deferred_save_keeps_text_and_excerpt(post_with_published_location):
+    post = Post.get_card_queryset().get(pk=post_with_published_location.pk)
+    post.title = "Новое название"
+    post.save()
+    post = Post.objects.get(pk=post.pk)
+    assert post.text == post_with_published_location.text
+    assert post.excerpt == post_with_published_location.excerpt
+
+
+def test_backfill_excerpts(many_posts_with_published_locations):
+    Post.objects.update(excerpt="")
+    out = StringIO()
+    call_command("backfill_excerpts", batch_size=3, stdout=out)
+    assert not Post.objects.filter(excerpt="").exists()
+    for post in Post.objects.all():
+        assert post.excerpt == Post.make_excerpt(post.text)
+    assert "Updated 20 excerpts" in out.getvalue()
+
+
+def test_fixture_posts_get_excerpt(post_with_published_location):
+    [record] = json.loads(
+        serializers.serialize("json", [post_with_published_location])
+    )
+    record["pk"] = None
+    del record["fields"]["excerpt"]
+    # A raw save, as made by loaddata
+    [loaded] = serializers.deserialize("json", json.dumps([record]))
+    loaded.save()
+    post = Post.objects.get(pk=loaded.object.pk)
+    assert post.excerpt == truncatewords(post.text, 10), (
+        "Убедитесь, что публикации из фикстур получают поле `excerpt`."
+    )
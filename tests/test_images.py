@@ -0,0 +1,235 @@
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import override_settings
+from PIL import Image
+
+from blog.image_processing import image_processor
+from blog.models import Post
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("media_root"),
+]
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(
+        MEDIA_ROOT=tmp_path, POST_IMAGE_WIDTHS=(320, 640, 1280),
+        POST_IMAGE_PROCESSING="sync",
+    ):
+        yield tmp_path
+
+
+@pytest.fixture
+def save_and_process(django_capture_on_commit_callbacks):
+    def save(post):
+        with django_capture_on_commit_callbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+    return save
+
+
+def _image_file(size=(1500, 1000), name="photo.jpg", orientation=None):
+    image = Image.new("RGB", size, color=(73, 109, 137))
+    exif = Image.Exif()
+    # Camera make, which must not reach the readers
+    exif[0x010F] = "Camera"
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return ImageFile(buffer, name=name)
+
+
+@pytest.fixture
+def post_with_image(post_with_published_location, save_and_process):
+    post = post_with_published_location
+    post.image = _image_file()
+    save_and_process(post)
+    return post
+
+
+def test_save_does_not_wait_for_processing(post_with_published_location):
+    post = post_with_published_location
+    post.image = _image_file()
+    post.save()
+    post.refresh_from_db()
+    assert post.image_renditions == {}, (
+        "Убедитесь, что изображение обрабатывается после сохранения"
+        " публикации, а не во время запроса."
+    )
+
+
+def test_renditions_made_on_upload(media_root, post_with_image):
+    sources = post_with_image.image_renditions["sources"]
+    assert post_with_image.image_renditions["name"] == (
+        post_with_image.image.name
+    )
+    for image_format, extension in (("webp", ".webp"), ("jpeg", ".jpg")):
+        assert [width for width, name in sources[image_format]] == [
+            320, 640, 1280
+        ], "Убедитесь, что для изображения создаются копии нужной ширины."
+        for width, name in sources[image_format]:
+            assert name.startswith("blog_images/") and name.endswith(extension)
+            with Image.open(media_root / name) as rendition:
+                assert rendition.format == image_format.upper()
+                assert rendition.width == width
+
+
+def test_no_upscaling_and_exif_orientation(
+        post_with_published_location, save_and_process
+):
+    post = post_with_published_location
+    # Rotated by 90 degrees: 200x100 pixels displayed as 100x200
+    post.image = _image_file(size=(200, 100), orientation=6)
+    save_and_process(post)
+    sources = post.image_renditions["sources"]
+    assert [width for width, name in sources["jpeg"]] == [100]
+    with post.image.storage.open(sources["jpeg"][0][1]) as file:
+        assert Image.open(file).size == (100, 200)
+
+
+def test_original_stripped_of_exif(media_root, post_with_image):
+    with Image.open(media_root / post_with_image.image.name) as original:
+        assert original.size == (1500, 1000)
+        assert not original.getexif(), (
+            "Убедитесь, что из оригинала изображения удаляются данные EXIF."
+        )
+
+
+def test_upload_with_exif_deleted(media_root, post_with_published_location):
+    post = post_with_published_location
+    post.image = _image_file()
+    # Stored as uploaded, processing is not run yet
+    post.save()
+    post.refresh_from_db()
+    upload = post.image.name
+    with Image.open(media_root / upload) as original:
+        assert original.getexif()
+    image_processor.process(post.pk, upload)
+    post.refresh_from_db()
+    assert post.image.name != upload
+    assert not (media_root / upload).exists(), (
+        "Убедитесь, что загруженный файл с данными EXIF удаляется"
+        " сразу после обработки изображения."
+    )
+
+
+# Files the user replaced are kept for the grace time otherwise
+@override_settings(MEDIA_RELEASE_GRACE=0)
+def test_replaced_image_drops_old_renditions(
+        media_root, post_with_image, save_and_process
+):
+    old_names = [
+        name for sources in post_with_image.image_renditions["sources"]
+        .values() for width, name in sources
+    ]
+    old_image = post_with_image.image.name
+    post_with_image.image = _image_file(size=(1400, 1000), name="other.jpg")
+    save_and_process(post_with_image)
+    assert all(not (media_root / name).exists() for name in old_names)
+    assert post_with_image.image_renditions["name"] not in (old_image, None)
+
+
+def test_card_uses_srcset(client, post_with_image):
+    content = client.get("/").content.decode()
+    assert 'type="image/webp"' in content and "1280w" in content
+    assert 'loading="lazy"' in content and "sizes=" in content, (
+        "Убедитесь, что изображение в карточке загружается лениво"
+        " и содержит `srcset` и `sizes`."
+    )
+
+
+def test_card_falls_back_to_original(client, post_with_image):
+    Post.objects.filter(pk=post_with_image.pk).update(image_renditions={})
+    content = client.get("/").content.decode()
+    assert "srcset" not in content
+    assert f'src="{post_with_image.image.url}"' in content
+
+
+def test_backfill_command(post_with_image):
+    Post.objects.filter(pk=post_with_image.pk).update(image_renditions={})
+    out = StringIO()
+    call_command("backfill_renditions", stdout=out)
+    assert "1 posts" in out.getvalue()
+    post_with_image.refresh_from_db()
+    assert post_with_image.image_renditions["name"] == (
+        post_with_image.image.name
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_processed_in_worker_process(post_with_published_location):
+    post = post_with_published_location
+    # Stored without the post_save receivers, which process it in place
+    name = post.image.storage.save(
+        "blog_images/photo.jpg", _image_file(size=(700, 400))
+    )
+    Post.objects.filter(pk=post.pk).update(image=name)
+    post.refresh_from_db()
+    try:
+        record = image_processor.submit(post.pk, post.image.name).result(
+            timeout=60
+        )
+    finally:
+        image_processor.shutdown()
+    post.refresh_from_db()
+    assert post.image_renditions == record
+    assert [width for width, name in record["sources"]["webp"]] == [320, 640]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_broken_pool_is_replaced(post_with_published_location):
+    post = post_with_published_location
+    name = post.image.storage.save(
+        "blog_images/photo.jpg", _image_file(size=(400, 300))
+    )
+    Post.objects.filter(pk=post.pk).update(image=name)
+    try:
+        # A worker dies, e.g. killed for its memory use
+        died = image_processor.get_executor().submit(os._exit, 1)
+        assert isinstance(died.exception(timeout=60), BrokenProcessPool)
+        record = image_processor.submit(post.pk, name).result(timeout=60)
+    finally:
+        image_processor.shutdown()
+    post.refresh_from_db()
+    assert record and post.image_renditions == record, (
+        "Убедитесь, что сломанный пул процессов заменяется новым."
+    )
+
+
+def test_pool_broken_while_processing_is_dropped(monkeypatch):
+    executor = ProcessPoolExecutor(max_workers=1)
+    monkeypatch.setattr(image_processor, "executor", executor)
+    processed, stored = Future(), Future()
+    processed.set_exception(BrokenProcessPool())
+    image_processor.store(executor, stored, 1, "photo.jpg", processed)
+    assert isinstance(stored.exception(), BrokenProcessPool)
+    assert image_processor.executor is None
+
+
+def test_schedule_errors_are_logged(
+        monkeypatch, caplog, post_with_published_location, save_and_process
+):
+    def fail(*args):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr("blog.image_processing.store_processed_image", fail)
+    post = post_with_published_location
+    post.image = _image_file()
+    with caplog.at_level(logging.ERROR, logger="blog.images"):
+        save_and_process(post)
+    assert post.image and post.image_renditions == {}, (
+        "Убедитесь, что ошибка обработки изображения после сохранения"
+        " публикации не приводит к ошибке запроса."
+    )
+    assert "Cannot schedule the image" in caplog.text
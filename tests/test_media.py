@@ -0,0 +1,122 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.test import override_settings
+
+from blog.storage import ContentAddressedStorage
+
+pytestmark = [pytest.mark.django_db]
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path):
+    root = tmp_path / "media"
+    root.mkdir()
+    (tmp_path / "secret.txt").write_text("secret")
+    with override_settings(MEDIA_ROOT=root, MEDIA_SENDFILE_HEADER=None):
+        yield root
+
+
+@pytest.fixture
+def legacy_file(media_root):
+    (media_root / "blog_images").mkdir()
+    (media_root / "blog_images" / "photo.jpg").write_bytes(CONTENT)
+    return "blog_images/photo.jpg"
+
+
+@pytest.fixture
+def hashed_file(media_root):
+    return ContentAddressedStorage().save(
+        "blog_images/photo.jpg", ContentFile(CONTENT)
+    )
+
+
+def _content(response):
+    return b"".join(response.streaming_content)
+
+
+def test_serves_file(client, legacy_file):
+    response = client.get(f"/media/{legacy_file}")
+    assert response.status_code == 200
+    assert _content(response) == CONTENT
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Content-Length"] == str(len(CONTENT))
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["ETag"].startswith('"')
+    assert "immutable" not in response["Cache-Control"]
+
+
+def test_hashed_file_is_immutable(client, hashed_file):
+    response = client.get(f"/media/{hashed_file}")
+    digest = hashed_file.rsplit("/", 1)[-1].split(".")[0]
+    assert response["ETag"] == f'"{digest}"'
+    assert "immutable" in response["Cache-Control"], (
+        "Убедитесь, что файлы с хешем в имени отдаются с"
+        " `Cache-Control: immutable`."
+    )
+    assert "max-age=31536000" in response["Cache-Control"]
+
+
+def test_not_modified(client, hashed_file):
+    etag = client.get(f"/media/{hashed_file}")["ETag"]
+    response = client.get(f"/media/{hashed_file}", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1020-5000", 1020, 1023),
+])
+def test_range(client, legacy_file, header, start, end):
+    response = client.get(f"/media/{legacy_file}", HTTP_RANGE=header)
+    assert response.status_code == 206, (
+        "Убедитесь, что запрос части файла возвращает статус 206."
+    )
+    assert _content(response) == CONTENT[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/1024"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range(client, legacy_file):
+    response = client.get(f"/media/{legacy_file}", HTTP_RANGE="bytes=2000-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == "bytes */1024"
+
+
+def test_outdated_if_range_gets_whole_file(client, hashed_file):
+    response = client.get(
+        f"/media/{hashed_file}", HTTP_RANGE="bytes=0-9",
+        HTTP_IF_RANGE='"outdated"'
+    )
+    assert response.status_code == 200
+    assert _content(response) == CONTENT
+
+
+@pytest.mark.parametrize("path", [
+    "../secret.txt", "%2e%2e/secret.txt", "blog_images/.upload-1234",
+    "blog_images/", "blog_images/missing.jpg",
+])
+def test_confined_to_media_root(client, legacy_file, media_root, path):
+    (media_root / "blog_images" / ".upload-1234").write_bytes(b"partial")
+    response = client.get(f"/media/{path}")
+    assert response.status_code == 404, (
+        "Убедитесь, что отдаются только файлы из `MEDIA_ROOT`."
+    )
+
+
+@override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect")
+def test_x_accel_redirect(client, hashed_file):
+    response = client.get(f"/media/{hashed_file}")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response["X-Accel-Redirect"] == f"/protected-media/{hashed_file}"
+    assert "immutable" in response["Cache-Control"]
+
+
+@override_settings(MEDIA_SENDFILE_HEADER="X-Sendfile")
+def test_x_sendfile(client, legacy_file, media_root):
+    response = client.get(f"/media/{legacy_file}")
+    assert response["X-Sendfile"] == str(media_root / legacy_file)
@@ -0,0 +1,171 @@
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+
+from blog.models import Post
+from blogicum.settings import CACHES, CACHE_DATABASE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _rendered(response, template_name="blog/index.html"):
+    # Holes of cached pages are rendered anyway, look for the page itself
+    return template_name in [template.name for template in response.templates]
+
+
+@pytest.mark.parametrize("url", ["/", "/pages/about/", "/pages/rules/"])
+def test_anonymous_pages_are_cached(
+        client, django_assert_num_queries, url,
+        many_posts_with_published_locations
+):
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content, (
+        f"Убедитесь, что страница `{url}` для анонимного пользователя"
+        " отдаётся из кеша."
+    )
+
+
+def test_cache_key_includes_query_string(
+        client, many_posts_with_published_locations
+):
+    first_page = client.get("/").content
+    second_page = client.get("/", {"page": 2}).content
+    assert first_page != second_page
+
+
+def test_authenticated_users_share_cached_pages(
+        client, another_user_client, another_user,
+        many_posts_with_published_locations
+):
+    client.get("/")
+    response = another_user_client.get("/")
+    assert not _rendered(response), (
+        "Убедитесь, что пользователь без скрытых публикаций получает"
+        " ленту из общего кеша страниц."
+    )
+    content = response.content.decode("utf-8")
+    assert another_user.username in content and "Войти" not in content, (
+        "Убедитесь, что шапка страницы из кеша заполняется для текущего"
+        " пользователя."
+    )
+    assert response["ETag"] != client.get("/")["ETag"]
+
+
+def test_user_with_hidden_posts_is_not_shared_page(
+        client, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    client.get("/")
+    post.is_published = False
+    post.save()
+    client.get("/")
+    response = user_client.get("/")
+    assert _rendered(response)
+    assert post.title in response.content.decode("utf-8"), (
+        "Убедитесь, что автор видит свои скрытые публикации в ленте."
+    )
+
+
+@pytest.mark.parametrize("client_name, can_edit, can_comment", [
+    ("client", False, False),
+    ("user_client", True, True),
+    ("another_user_client", False, True),
+])
+def test_post_page_holes_filled_per_user(
+        request, client, mixer, user, client_name, can_edit, can_comment,
+        post_with_published_location
+):
+    post = post_with_published_location
+    mixer.blend("blog.Comment", post=post, author=user)
+    url = f"/posts/{post.id}/"
+    client.get(url)
+    response = request.getfixturevalue(client_name).get(url)
+    content = response.content.decode("utf-8")
+    assert "<!--hole:" not in content
+    assert ("Отредактировать публикацию" in content) is can_edit
+    assert ("Отредактировать комментарий" in content) is can_edit, (
+        "Убедитесь, что ссылки на редактирование видны только автору."
+    )
+    assert ("csrfmiddlewaretoken" in content) is can_comment, (
+        "Убедитесь, что форма комментария видна только"
+        " авторизованным пользователям."
+    )
+
+
+def test_saving_models_invalidates_cache(
+        client, post_with_published_location, published_location,
+        published_category
+):
+    post = post_with_published_location
+    client.get("/")
+    for instance, field in (
+        (post, "title"),
+        (published_category, "title"),
+        (published_location, "name"),
+    ):
+        setattr(instance, field, f"Новое значение {field}")
+        instance.save()
+        content = client.get("/").content.decode("utf-8")
+        assert f"Новое значение {field}" in content, (
+            "Убедитесь, что кеш страниц сбрасывается при изменении"
+            f" модели `{type(instance).__name__}`."
+        )
+
+    post.delete()
+    assert post.title not in client.get("/").content.decode("utf-8")
+
+
+def test_page_cache_dropped_again_on_commit(
+        client, post_with_published_location,
+        django_capture_on_commit_callbacks
+):
+    post = post_with_published_location
+    # No image to process on commit, which would save the post again
+    post.image = ""
+    post.save()
+    with django_capture_on_commit_callbacks() as callbacks:
+        post.title = "Новый заголовок"
+        post.save()
+        # Rendered while the transaction runs, e.g. from the old rows
+        client.get("/")
+    for callback in callbacks:
+        callback()
+    assert _rendered(client.get("/")), (
+        "Убедитесь, что кеш страниц сбрасывается ещё раз после фиксации"
+        " транзакции."
+    )
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def test_zero_timeout_disables_cache(
+        client, many_posts_with_published_locations
+):
+    client.get("/")
+    assert _rendered(client.get("/"))
+
+
+@pytest.mark.django_db(databases=["default", CACHE_DATABASE])
+def test_pages_cached_in_configured_cache(
+        client, many_posts_with_published_locations
+):
+    # The tests run with a local memory cache, see conftest
+    with override_settings(CACHES=CACHES):
+        cache.clear()
+        first = client.get("/")
+        assert _rendered(first)
+        with connections[CACHE_DATABASE].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM blog_cache")
+            assert cursor.fetchone()[0] > 0, (
+                "Убедитесь, что страницы хранятся в общем кеше."
+            )
+        second = client.get("/")
+        assert not _rendered(second) and second.content == first.content
+        post = Post.objects.get(pk=first.context["page_obj"][0].pk)
+        post.title = "Новый заголовок"
+        post.save()
+        third = client.get("/")
+        assert _rendered(third)
+        assert "Новый заголовок" in third.content.decode()
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+import pytest
+from django.test.client import Client
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _walk_cursor_pages(client: Client, url: str):
+    seen = []
+    pages = 0
+    response = client.get(url, {"cursor": ""})
+    while True:
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что страница `{url}` в режиме `?cursor=`"
+            " отображается без ошибок."
+        )
+        page = response.context["page_obj"]
+        seen.extend(post.id for post in page)
+        pages += 1
+        if not page.has_next():
+            return seen, pages
+        response = client.get(url, {"cursor": page.next_cursor})
+
+
+def test_cursor_pagination_matches_page_mode(
+        user_client, user, many_posts_with_published_locations,
+        published_category
+):
+    posts = many_posts_with_published_locations
+    for url in (
+        "/",
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    ):
+        seen, pages = _walk_cursor_pages(user_client, url)
+        assert len(seen) == len(set(seen)) == len(posts), (
+            f"Убедитесь, что курсорная пагинация на странице `{url}`"
+            " возвращает каждую публикацию ровно один раз."
+        )
+        assert pages == len(posts) // N_PER_PAGE
+
+        by_page = []
+        for number in range(1, pages + 1):
+            response = user_client.get(url, {"page": number})
+            by_page.extend(post.id for post in response.context["page_obj"])
+        assert set(by_page) == set(seen), (
+            f"Убедитесь, что режимы `?page=` и `?cursor=` на странице `{url}`"
+            " возвращают одни и те же публикации."
+        )
+
+
+def test_cursor_pagination_previous_link(
+        user_client, many_posts_with_published_locations
+):
+    first = user_client.get("/", {"cursor": ""}).context["page_obj"]
+    assert not first.has_previous()
+    second = user_client.get(
+        "/", {"cursor": first.next_cursor}
+    ).context["page_obj"]
+    assert second.has_previous()
+    back = user_client.get(
+        "/", {"cursor": second.previous_cursor}
+    ).context["page_obj"]
+    assert [p.id for p in back] == [p.id for p in first], (
+        "Убедитесь, что ссылка на предыдущую страницу в режиме `?cursor=`"
+        " возвращает предыдущую страницу ленты."
+    )
+    assert not back.has_previous()
+
+
+def test_invalid_cursor_returns_404(user_client):
+    response = user_client.get("/", {"cursor": "not-a-cursor"})
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.cache import get_cached_post, get_post_cache_key
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _post_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    post_queries = [
+        q for q in ctx.captured_queries if 'FROM "blog_post"' in q["sql"]
+    ]
+    return response, post_queries
+
+
+def test_detail_reads_post_from_cache(
+        user_client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    _post_queries(user_client, url)
+    response, post_queries = _post_queries(user_client, url)
+    assert response.status_code == HTTPStatus.OK
+    assert not post_queries, (
+        "Убедитесь, что страница публикации берёт публикацию из кеша."
+    )
+
+
+def test_missing_post_is_negatively_cached(user_client):
+    response, post_queries = _post_queries(user_client, "/posts/9999/")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert len(post_queries) == 1
+    response, post_queries = _post_queries(user_client, "/posts/9999/")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert not post_queries
+
+
+def test_cached_post_invalidated_by_related_changes(
+        post_with_published_location, published_category,
+        published_location, user
+):
+    post = post_with_published_location
+    for instance, field, value, read in (
+        (post, "title", "Новое название", lambda p: p.title),
+        (published_category, "is_published", False,
+         lambda p: p.category.is_published),
+        (published_location, "name", "Новое место", lambda p: p.location.name),
+        (user, "username", "new_username", lambda p: p.author.username),
+    ):
+        get_cached_post(post.id)
+        setattr(instance, field, value)
+        instance.save()
+        assert read(get_cached_post(post.id)) == value, (
+            "Убедитесь, что кеш публикации сбрасывается при изменении"
+            f" модели `{type(instance).__name__}`."
+        )
+
+    post.delete()
+    assert get_cached_post(post_with_published_location.pk) is None
+
+
+def test_login_keeps_cached_posts(client, post_with_published_location):
+    from django.contrib.auth.models import update_last_login
+
+    post = post_with_published_location
+    cached = get_cached_post(post.id)
+    update_last_login(None, post.author)
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_cached_post(post.id).title == cached.title
+    assert not ctx.captured_queries
+
+
+def test_cached_post_dropped_again_on_commit(
+        post_with_published_location, django_capture_on_commit_callbacks
+):
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks() as callbacks:
+        Post.objects.filter(pk=post.pk).update(image="")
+        post.refresh_from_db()
+        post.title = "Новый заголовок"
+        post.save()
+        # Filled while the transaction runs, e.g. from the old row
+        get_cached_post(post.pk)
+    assert cache.get(get_post_cache_key(post.pk)) is not None
+    for callback in callbacks:
+        callback()
+    assert cache.get(get_post_cache_key(post.pk)) is None, (
+        "Убедитесь, что публикация удаляется из кеша ещё раз после"
+        " фиксации транзакции."
+    )
+
+
+def test_deleted_category_drops_cached_posts(post_with_published_location):
+    post = post_with_published_location
+    get_cached_post(post.pk)
+    post.category.delete()
+    assert get_cached_post(post.pk).category is None
@@ -0,0 +1,73 @@
+import json
+import logging
+import time
+
+import pytest
+from django.template.response import SimpleTemplateResponse
+from django.test import override_settings
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def profile_every_request(settings):
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+
+
+def _parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(","):
+        name, *params = metric.strip().split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def test_server_timing_header(
+        user_client, many_posts_with_published_locations
+):
+    response = user_client.get("/")
+    assert "Server-Timing" in response, (
+        "Убедитесь, что ответ содержит заголовок `Server-Timing`."
+    )
+    metrics = _parse_server_timing(response["Server-Timing"])
+    assert set(metrics) == {"sql", "sql-slowest", "render", "view", "total"}
+    assert metrics["sql"]["desc"] == '"5 queries"'
+    assert float(metrics["render"]["dur"]) > 0
+    assert float(metrics["total"]["dur"]) >= float(metrics["view"]["dur"])
+
+
+def test_render_time_of_cached_pages(
+        client, post_with_published_location, monkeypatch
+):
+    render = SimpleTemplateResponse.render
+
+    def slow_render(response):
+        if not response.is_rendered:
+            time.sleep(0.2)
+        return render(response)
+
+    monkeypatch.setattr(SimpleTemplateResponse, "render", slow_render)
+    # Rendered within the view, to be stored in the page cache
+    metrics = _parse_server_timing(client.get("/")["Server-Timing"])
+    assert float(metrics["render"]["dur"]) >= 200, (
+        "Убедитесь, что время рендера страниц, сохраняемых в кеш,"
+        " учитывается в метрике `render`."
+    )
+    assert float(metrics["view"]["dur"]) < 200
+    assert float(metrics["total"]["dur"]) >= 200
+
+
+@override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+def test_unsampled_requests_are_not_profiled(client):
+    assert "Server-Timing" not in client.get("/")
+
+
+@override_settings(REQUEST_PROFILING_LOG=True)
+def test_structured_log_line(client, caplog, post_with_published_location):
+    with caplog.at_level(logging.INFO, logger="blog.profiling"):
+        client.get("/")
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["path"] == "/" and record["status"] == 200
+    assert record["queries"] == 2
+    assert record["slowest_sql"].startswith("SELECT")
@@ -0,0 +1,84 @@
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+# session + user lookups made by the authentication middleware
+AUTH_QUERIES = 2
+
+
+@pytest.mark.parametrize("url_template, n_queries", [
+    ("/", 2),
+    ("/category/{category}/", 3),
+])
+def test_anonymous_feed_query_count(
+        client, django_assert_num_queries, url_template, n_queries,
+        many_posts_with_published_locations, published_category
+):
+    url = url_template.format(category=published_category.slug)
+    with django_assert_num_queries(n_queries):
+        response = client.get(url)
+    assert len(response.context["page_obj"]) > 0
+
+
+@pytest.mark.parametrize("url_template, n_queries", [
+    # the feed validators aggregate both branches of the visible posts
+    ("/", 3),
+    ("/category/{category}/", 4),
+    # profile user, post stats aggregate, page of posts
+    ("/profile/{username}/", 3),
+])
+def test_card_queryset_query_count(
+        user_client, user, django_assert_num_queries, url_template,
+        n_queries, many_posts_with_published_locations, published_category
+):
+    url = url_template.format(
+        category=published_category.slug, username=user.username
+    )
+    with django_assert_num_queries(AUTH_QUERIES + n_queries):
+        response = user_client.get(url)
+    assert len(response.context["page_obj"]) > 0, (
+        f"Убедитесь, что данные карточек публикаций на странице `{url}`"
+        " загружаются одним запросом, без запросов на каждую карточку."
+    )
+
+
+@pytest.mark.parametrize("url_template, n_queries", [
+    # the post form also lists locations and categories
+    ("/posts/{post}/edit/", 3),
+    ("/posts/{post}/delete/", 1),
+    ("/posts/{post}/edit_comment/{comment}/", 1),
+    ("/posts/{post}/delete_comment/{comment}/", 1),
+])
+def test_owner_object_loaded_once(
+        user_client, user, mixer, django_assert_num_queries, url_template,
+        n_queries, post_with_published_location
+):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+    url = url_template.format(post=post.id, comment=comment.id)
+    with django_assert_num_queries(AUTH_QUERIES + n_queries):
+        response = user_client.get(url)
+    assert response.status_code == 200, (
+        f"Убедитесь, что страница `{url}` загружает объект одним запросом."
+    )
+
+
+def test_profile_queries_for_another_user(
+        another_user_client, user, django_assert_num_queries,
+        many_posts_with_published_locations,
+        unpublished_posts_with_published_locations
+):
+    with django_assert_num_queries(AUTH_QUERIES + 3):
+        response = another_user_client.get(f"/profile/{user.username}/")
+    stats = response.context["profile_stats"]
+    published = [
+        post for post in many_posts_with_published_locations
+        if post.pub_date <= timezone.now()
+    ]
+    assert stats["post_count"] == len(published)
+    assert stats["last_pub_date"] == max(post.pub_date for post in published)
+    assert response.context["page_obj"].paginator.count == len(published), (
+        "Убедитесь, что другим пользователям на странице профиля видны"
+        " только опубликованные публикации."
+    )
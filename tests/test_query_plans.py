@@ -0,0 +1,84 @@
+from typing import List
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from blog.models import Post
+from blog.visibility import filter_posts
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != "sqlite",
+        reason="EXPLAIN QUERY PLAN output is SQLite specific",
+    ),
+]
+
+
+def explain(queryset) -> List[str]:
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_uses_index(queryset, index_name: str, page: str):
+    plan = explain(queryset)
+    assert any(index_name in step for step in plan), (
+        f"Убедитесь, что запрос {page} использует индекс `{index_name}`."
+        f" План запроса: {plan}"
+    )
+    assert not any("TEMP B-TREE" in step for step in plan), (
+        f"Убедитесь, что запрос {page} не сортирует таблицу целиком."
+        f" План запроса: {plan}"
+    )
+
+
+def test_feed_query_plan(many_posts_with_published_locations):
+    assert_uses_index(
+        Post.get_published_posts()[:10],
+        "post_published_feed_idx",
+        "главной страницы",
+    )
+    assert_uses_index(
+        Post.get_published_posts().order_by("-pub_date", "-id")[:10],
+        "post_published_feed_idx",
+        "главной страницы в режиме `?cursor=`",
+    )
+
+
+def test_category_query_plan(
+        many_posts_with_published_locations, published_category
+):
+    assert_uses_index(
+        Post.get_published_posts(queryset=published_category.posts)[:10],
+        "post_category_feed_idx",
+        "страницы категории",
+    )
+
+
+def test_profile_query_plan(user, many_posts_with_published_locations):
+    assert_uses_index(
+        Post.get_published_posts(user=user, queryset=user.posts)[:10],
+        "post_author_pub_date_idx",
+        "страницы профиля",
+    )
+
+
+def test_authenticated_feed_query_plan(
+        user, many_posts_with_published_locations
+):
+    queryset = Post.get_published_posts(user=user)
+    for page_queryset in (
+        queryset[:10],
+        filter_posts(queryset, pub_date__lt=timezone.now())[:10],
+    ):
+        plan = explain(page_queryset)
+        assert any("UNION ALL" in step for step in plan), plan
+        assert any("post_published_feed_idx" in step for step in plan), plan
+        assert any("post_author_pub_date_idx" in step for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), (
+            "Убедитесь, что запрос главной страницы для авторизованного"
+            f" пользователя не сортирует таблицу целиком. План: {plan}"
+        )
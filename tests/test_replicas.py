@@ -0,0 +1,170 @@
+import sqlite3
+import time
+from io import StringIO
+
+import pytest
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from blog import writes
+from blog.cache import get_cached_post
+from blog.middleware import ReplicaRoutingMiddleware
+from blog.models import Comment, Post
+from blog.routers import ReplicaRouter, primary_reads
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("replica"),
+]
+
+router = ReplicaRouter()
+
+
+@pytest.fixture
+def replica():
+    with override_settings(
+        DATABASE_REPLICAS=["replica"], REPLICA_PIN_SECONDS=10,
+        REPLICA_PIN_COOKIE="primary_pin"
+    ):
+        yield
+
+
+def _serve(request, write=False):
+    """Pass a request through the middleware, recording its read alias."""
+    routed = {}
+
+    def view(request):
+        if write:
+            router.db_for_write(Post)
+        routed["read"] = router.db_for_read(Post)
+        return HttpResponse()
+
+    response = ReplicaRoutingMiddleware(view)(request)
+    return routed["read"], response
+
+
+def test_safe_requests_read_from_replica():
+    read, response = _serve(RequestFactory().get("/"))
+    assert read == "replica", (
+        "Убедитесь, что чтение в GET-запросах идёт с реплики."
+    )
+    assert "primary_pin" not in response.cookies
+
+
+def test_reads_outside_requests_use_primary():
+    assert router.db_for_read(Post) == "default"
+    assert router.db_for_write(Post) == "default"
+
+
+def test_write_pins_user_to_primary():
+    read, response = _serve(RequestFactory().post("/"), write=True)
+    assert read == "default"
+    cookie = response.cookies["primary_pin"]
+    assert cookie["max-age"] == 10
+
+    request = RequestFactory().get("/")
+    request.COOKIES["primary_pin"] = cookie.value
+    read, _ = _serve(request)
+    assert read == "default", (
+        "Убедитесь, что после записи пользователь читает с основной базы."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(COMMENT_WRITE_QUEUE=True)
+def test_queued_comment_pins_user_to_primary(
+        user, post_with_published_location
+):
+    def view(request):
+        # Ids only: assigning the post itself asks the router for a write
+        writes.save_comment(Comment(
+            post_id=post_with_published_location.pk, author_id=user.pk,
+            text="Текст"
+        ))
+        return HttpResponse()
+
+    response = ReplicaRoutingMiddleware(view)(RequestFactory().post("/"))
+    assert "primary_pin" in response.cookies, (
+        "Убедитесь, что комментарий, сохранённый через очередь записи,"
+        " привязывает пользователя к основной базе."
+    )
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.parametrize("pinned_until", [str(time.time() - 1), "garbage"])
+def test_expired_pin_reads_from_replica(pinned_until):
+    request = RequestFactory().get("/")
+    request.COOKIES["primary_pin"] = pinned_until
+    assert _serve(request)[0] == "replica"
+
+
+def test_primary_reads_block():
+    routed = []
+
+    def view(request):
+        with primary_reads():
+            routed.append(router.db_for_read(Post))
+        routed.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    ReplicaRoutingMiddleware(view)(RequestFactory().get("/"))
+    assert routed == ["default", "replica"]
+
+
+def test_caches_filled_from_primary(post_with_published_location):
+    post_id = post_with_published_location.pk
+
+    def view(request):
+        # The replica alias is no database here: reading it would fail
+        return HttpResponse(get_cached_post(post_id).title)
+
+    response = ReplicaRoutingMiddleware(view)(RequestFactory().get("/"))
+    assert response.content.decode() == post_with_published_location.title, (
+        "Убедитесь, что общий кеш заполняется данными с основной базы,"
+        " а не с реплики."
+    )
+
+
+def test_replicas_are_not_migrated():
+    assert router.allow_migrate("default", "blog")
+    assert not router.allow_migrate("replica", "blog")
+
+
+def test_cache_table_has_its_own_database():
+    cache_entry = DatabaseCache("blog_cache", {}).cache_model_class
+    routed = {}
+
+    def view(request):
+        routed["read"] = router.db_for_read(cache_entry)
+        routed["write"] = router.db_for_write(cache_entry)
+        return HttpResponse()
+
+    response = ReplicaRoutingMiddleware(view)(RequestFactory().get("/"))
+    assert routed == {"read": "cache", "write": "cache"}
+    assert "primary_pin" not in response.cookies, (
+        "Убедитесь, что запись в кеш не привязывает пользователя"
+        " к основной базе."
+    )
+    assert router.allow_migrate("cache", "django_cache")
+    assert not router.allow_migrate("default", "django_cache")
+    assert not router.allow_migrate("cache", "blog")
+
+
+@pytest.mark.filterwarnings("ignore:Overriding setting DATABASES")
+def test_copy_to_replicas(tmp_path):
+    primary = tmp_path / "primary.sqlite3"
+    replica = tmp_path / "replica.sqlite3"
+    with sqlite3.connect(primary) as connection:
+        connection.execute("CREATE TABLE post (title TEXT)")
+        connection.execute("INSERT INTO post VALUES ('Первый пост')")
+    databases = {
+        alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": name}
+        for alias, name in (("default", primary), ("replica", replica))
+    }
+    with override_settings(DATABASES=databases):
+        call_command("copy_to_replicas", stdout=StringIO())
+    with sqlite3.connect(replica) as connection:
+        rows = connection.execute("SELECT title FROM post").fetchall()
+    assert rows == [("Первый пост",)]
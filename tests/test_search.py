@@ -0,0 +1,102 @@
+import pytest
+from django.utils import timezone
+
+from blog.models import Post
+from blog.search import build_match_query
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _search(client, query, **params):
+    response = client.get("/search/", {"q": query, **params})
+    assert response.status_code == 200
+    return list(response.context["page_obj"])
+
+
+def test_index_follows_post_changes(client, post_with_published_location):
+    post = post_with_published_location
+    post.title = "Путешествие по Карелии"
+    post.save()
+    assert _search(client, "карел") == [post], (
+        "Убедитесь, что поиск находит публикацию по началу слова"
+        " из заголовка."
+    )
+
+    Post.objects.filter(pk=post.pk).update(title="Поход в горы")
+    assert _search(client, "карел") == []
+    assert _search(client, "горы") == [post], (
+        "Убедитесь, что поисковый индекс обновляется при изменении"
+        " публикаций."
+    )
+
+    post.delete()
+    assert _search(client, "горы") == []
+
+
+def test_search_respects_visibility(
+        client, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(
+        title="Черновик", is_published=False
+    )
+    assert _search(client, "черновик") == [], (
+        "Убедитесь, что поиск не показывает скрытые публикации."
+    )
+    assert [found.pk for found in _search(user_client, "черновик")] == [
+        post.pk
+    ]
+
+
+def test_title_match_ranks_first(
+        client, mixer, user, published_category
+):
+    in_text = mixer.blend(
+        "blog.Post", title="Заметка", text="про байкал", author=user,
+        category=published_category, is_published=True,
+        pub_date=timezone.now(), location=None,
+    )
+    in_title = mixer.blend(
+        "blog.Post", title="Байкал", text="заметка", author=user,
+        category=published_category, is_published=True,
+        pub_date=timezone.now(), location=None,
+    )
+    assert _search(client, "байкал") == [in_title, in_text], (
+        "Убедитесь, что совпадение в заголовке ранжируется выше."
+    )
+
+
+def test_search_keyset_pagination(
+        client, mixer, user, published_category
+):
+    mixer.cycle(15).blend(
+        "blog.Post", title="Озеро", author=user, location=None,
+        category=published_category, is_published=True,
+        pub_date=timezone.now(),
+    )
+    response = client.get("/search/", {"q": "озеро"})
+    first_page = list(response.context["page_obj"])
+    cursor = response.context["page_obj"].next_cursor
+    assert len(first_page) == 10 and cursor
+    second_page = _search(client, "озеро", cursor=cursor)
+    assert len(second_page) == 5
+    assert not set(first_page) & set(second_page)
+    assert f"q=%D0%BE%D0%B7%D0%B5%D1%80%D0%BE&amp;cursor={cursor}" in (
+        response.content.decode()
+    )
+
+
+@pytest.mark.parametrize("query", ['"', "OR AND NOT (", "title:*", ""])
+def test_query_syntax_is_not_interpreted(client, query):
+    assert _search(client, query) == []
+
+
+def test_match_query_quotes_terms():
+    assert build_match_query('кот" OR пёс*') == '"кот"* "OR"* "пёс"*'
+
+
+def test_admin_search_uses_index(admin_client, post_with_published_location):
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(title="Ладожское озеро")
+    response = admin_client.get("/admin/blog/post/", {"q": "ладож"})
+    assert list(response.context["cl"].result_list) == [post]
@@ -0,0 +1,46 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from blog.sqlite import get_pragma_statements
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.mark.parametrize("pragma, value", [
+    ("synchronous", 1),
+    ("busy_timeout", 5000),
+    ("cache_size", -64000),
+    ("temp_store", 2),
+])
+def test_pragmas_applied_to_connections(pragma, value):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {pragma}")
+        assert cursor.fetchone()[0] == value, (
+            f"Убедитесь, что для соединений с SQLite задаётся `{pragma}`"
+            " из настройки `SQLITE_PRAGMAS`."
+        )
+
+
+def test_journal_mode_set_first():
+    statements = get_pragma_statements(
+        {"synchronous": "normal", "journal_mode": "wal"}
+    )
+    assert statements == [
+        "PRAGMA journal_mode = wal", "PRAGMA synchronous = normal"
+    ]
+
+
+def test_benchmark_command():
+    out = StringIO()
+    call_command(
+        "benchmark_sqlite", duration=0.2, readers=2, writers=1, rows=100,
+        stdout=out
+    )
+    lines = out.getvalue().splitlines()
+    assert [line.split(":")[0].strip() for line in lines] == [
+        "default", "tuned"
+    ]
+    assert all("reads/s" in line for line in lines)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from blog.cache import get_or_compute
+
+
+def test_value_is_computed_once():
+    calls = []
+    for _ in range(3):
+        value = get_or_compute("key", lambda: calls.append(1) or "v", 60)
+    assert value == "v" and len(calls) == 1
+
+
+def test_stale_value_served_while_locked():
+    cache.set("key", ("stale", 0.1, time.time() - 1), 60)
+    cache.add("key:lock", 1, 60)
+    value = get_or_compute("key", lambda: "fresh", 60)
+    assert value == "stale", (
+        "Убедитесь, что пока другой воркер пересчитывает значение,"
+        " отдаётся устаревшее значение из кеша."
+    )
+
+
+def test_expired_value_recomputed_by_lock_holder():
+    cache.set("key", ("stale", 0.1, time.time() - 1), 60)
+    assert get_or_compute("key", lambda: "fresh", 60) == "fresh"
+    assert cache.get("key:lock") is None
+
+
+def test_early_refresh_before_expiry(monkeypatch):
+    monkeypatch.setattr("blog.cache.random.random", lambda: 0.5)
+    # A slow computation close to expiry gets refreshed ahead of time
+    cache.set("key", ("old", 10.0, time.time() + 1), 60)
+    assert get_or_compute("key", lambda: "new", 60) == "new"
+    # ...while a fast one far from expiry does not
+    cache.set("key", ("old", 0.01, time.time() + 60), 60)
+    assert get_or_compute("key", lambda: "new", 60) == "old"
+
+
+@override_settings(CACHE_LOCK_TIMEOUT=0.2)
+def test_lock_timeout_falls_back_to_compute():
+    cache.add("key:lock", 1, 60)
+    started = time.monotonic()
+    assert get_or_compute("key", lambda: "direct", 60) == "direct"
+    assert time.monotonic() - started < 1
+
+
+def test_should_cache_predicate():
+    get_or_compute("key", lambda: "error", 60, should_cache=lambda v: False)
+    assert cache.get("key") is None
+
+
+@override_settings(CACHE_LOCK_TIMEOUT=10)
+def test_waiters_stop_when_lock_released_without_value():
+    cache.add("key:lock", 1, 60)
+    # The lock holder gets a value it must not cache
+    holder = threading.Timer(0.1, cache.delete, ["key:lock"])
+    holder.start()
+    started = time.monotonic()
+    assert get_or_compute("key", lambda: "direct", 60) == "direct"
+    holder.join()
+    assert time.monotonic() - started < 1, (
+        "Убедитесь, что ожидающие воркеры не ждут весь таймаут блокировки,"
+        " если значение не было сохранено в кеш."
+    )
+
+
+@pytest.mark.django_db
+def test_page_cache_serves_stale_page_while_refreshing(
+        client, many_posts_with_published_locations
+):
+    from blog.cache import get_page_cache_key
+
+    first = client.get("/")
+    key = get_page_cache_key(first.wsgi_request)
+    response, delta, _ = cache.get(key)
+    cache.set(key, (response, delta, time.time() - 1), 60)
+    cache.add(f"{key}:lock", 1, 60)
+    assert client.get("/").content == first.content
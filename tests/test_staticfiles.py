@@ -0,0 +1,95 @@
+import gzip
+import json
+
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import override_settings
+
+from blog import staticfiles
+
+BOOTSTRAP = "css/bootstrap.min.css"
+
+
+@pytest.fixture(scope="module")
+def static_root(tmp_path_factory):
+    root = tmp_path_factory.mktemp("static_root")
+    with override_settings(STATIC_ROOT=root):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        yield root
+
+
+@pytest.fixture
+def hashed_bootstrap(static_root):
+    manifest = json.loads((static_root / "staticfiles.json").read_text())
+    return manifest["paths"][BOOTSTRAP]
+
+
+def test_url_before_collectstatic():
+    assert staticfiles_storage.url(BOOTSTRAP) == f"/static/{BOOTSTRAP}"
+
+
+def test_collectstatic_writes_compressed_variants(
+        static_root, hashed_bootstrap
+):
+    assert hashed_bootstrap != BOOTSTRAP
+    assert staticfiles_storage.url(BOOTSTRAP) == f"/static/{hashed_bootstrap}"
+    original = (static_root / hashed_bootstrap).read_bytes()
+    compressed = (static_root / f"{hashed_bootstrap}.gz").read_bytes()
+    assert gzip.decompress(compressed) == original, (
+        "Убедитесь, что при сборке статики создаются сжатые копии файлов."
+    )
+    assert (static_root / f"{BOOTSTRAP}.gz").exists()
+    assert not list(static_root.glob("img/*.png.gz")), (
+        "Убедитесь, что уже сжатые форматы не сжимаются повторно."
+    )
+    if staticfiles.brotli is not None:
+        assert staticfiles.brotli.decompress(
+            (static_root / f"{hashed_bootstrap}.br").read_bytes()
+        ) == original
+
+
+def test_serves_negotiated_variant(client, static_root, hashed_bootstrap):
+    response = client.get(
+        f"/static/{hashed_bootstrap}", HTTP_ACCEPT_ENCODING="gzip, deflate"
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Type"].startswith("text/css")
+    assert "Accept-Encoding" in response["Vary"]
+    assert "immutable" in response["Cache-Control"], (
+        "Убедитесь, что файлы статики с хешем в имени отдаются с"
+        " `Cache-Control: immutable`."
+    )
+    content = b"".join(response.streaming_content)
+    assert gzip.decompress(content) == (
+        static_root / hashed_bootstrap
+    ).read_bytes()
+
+
+@pytest.mark.parametrize("accept_encoding", ["", "gzip;q=0", "identity"])
+def test_serves_identity(client, static_root, hashed_bootstrap,
+                         accept_encoding):
+    response = client.get(
+        f"/static/{hashed_bootstrap}", HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+    assert not response.has_header("Content-Encoding")
+    assert "Accept-Encoding" in response["Vary"]
+
+
+def test_unhashed_name_is_revalidated(client, static_root):
+    response = client.get(f"/static/{BOOTSTRAP}")
+    assert response.status_code == 200
+    assert "immutable" not in response["Cache-Control"]
+    assert "max-age=3600" in response["Cache-Control"]
+
+
+def test_variants_have_own_etags(client, static_root, hashed_bootstrap):
+    url = f"/static/{hashed_bootstrap}"
+    gzipped = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+    plain = client.get(url)
+    assert gzipped["ETag"] != plain["ETag"]
+    response = client.get(
+        url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped["ETag"]
+    )
+    assert response.status_code == 304
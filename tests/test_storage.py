@@ -0,0 +1,194 @@
+import os
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.images import ImageFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from blog.image_processing import release_image
+from blog.models import Post
+from blog.storage import is_content_addressed
+from blogicum.settings import MEDIA_RELEASE_GRACE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=tmp_path, MEDIA_RELEASE_GRACE=0):
+        yield tmp_path
+
+
+@pytest.fixture
+def default_grace():
+    with override_settings(MEDIA_RELEASE_GRACE=MEDIA_RELEASE_GRACE):
+        yield
+
+
+def _image_file(color=(73, 109, 137), name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (50, 40), color=color).save(buffer, format="JPEG")
+    return ImageFile(buffer, name=name)
+
+
+def _create_post(mixer, user, image, on_commit):
+    post = mixer.blend("blog.Post", author=user, image=None)
+    post.image = image
+    with on_commit(execute=True):
+        post.save()
+    post.refresh_from_db()
+    return post
+
+
+@pytest.fixture
+def create_post(mixer, user, django_capture_on_commit_callbacks):
+    return lambda image: _create_post(
+        mixer, user, image, django_capture_on_commit_callbacks
+    )
+
+
+def test_identical_uploads_share_a_file(media_root, create_post):
+    first = create_post(_image_file(name="one.jpg"))
+    second = create_post(_image_file(name="two.JPG"))
+    other = create_post(_image_file(color=(0, 0, 0), name="one.jpg"))
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые изображения хранятся в одном файле."
+    )
+    assert other.image.name != first.image.name
+    assert is_content_addressed(first.image.name)
+    directory, shard1, shard2, filename = first.image.name.split("/")
+    assert directory == "blog_images" and filename.endswith(".jpg")
+    assert filename.startswith(shard1 + shard2)
+    assert (media_root / first.image.name).exists()
+
+
+def test_file_deleted_with_its_last_post(
+        media_root, create_post, django_capture_on_commit_callbacks
+):
+    first = create_post(_image_file())
+    second = create_post(_image_file())
+    path = media_root / first.image.name
+    renditions = [
+        media_root / name
+        for sources in first.image_renditions["sources"].values()
+        for width, name in sources
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert path.exists(), (
+        "Убедитесь, что файл, используемый другой публикацией, не удаляется."
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not path.exists()
+    assert renditions and not any(name.exists() for name in renditions)
+
+
+def test_replaced_image_released(
+        media_root, create_post, django_capture_on_commit_callbacks
+):
+    post = create_post(_image_file())
+    path = media_root / post.image.name
+    post.image = _image_file(color=(0, 0, 0))
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert not path.exists()
+
+
+def _rendition_paths(media_root, post):
+    return [
+        media_root / name
+        for sources in post.image_renditions["sources"].values()
+        for width, name in sources
+    ]
+
+
+@override_settings(MEDIA_RELEASE_GRACE=3600)
+def test_reused_file_kept_within_grace(
+        media_root, create_post, django_capture_on_commit_callbacks
+):
+    post = create_post(_image_file())
+    paths = [media_root / post.image.name] + _rendition_paths(
+        media_root, post
+    )
+    for path in paths:
+        os.utime(path, (0, 0))
+    # An identical upload, whose post is not saved yet
+    assert post.image.storage.save(
+        "blog_images/photo.jpg", _image_file()
+    ) == post.image.name
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert paths[0].exists(), (
+        "Убедитесь, что файл, только что загруженный повторно,"
+        " не удаляется вместе с последней публикацией."
+    )
+    assert not any(path.exists() for path in paths[1:])
+
+
+@pytest.mark.usefixtures("default_grace")
+def test_release_without_grace(media_root):
+    storage = Post._meta.get_field("image").storage
+    name = storage.save("blog_images/photo.jpg", _image_file())
+    assert not release_image(name)
+    assert (media_root / name).exists()
+    assert release_image(name, grace=False), (
+        "Убедитесь, что файлы, заменённые при обработке, удаляются сразу."
+    )
+    assert not (media_root / name).exists()
+
+
+def test_delete_orphan_media_command(
+        media_root, create_post, django_capture_on_commit_callbacks
+):
+    kept = create_post(_image_file())
+    orphan = create_post(_image_file(color=(0, 0, 0)))
+    kept_paths = [media_root / kept.image.name] + _rendition_paths(
+        media_root, kept
+    )
+    orphan_paths = [media_root / orphan.image.name] + _rendition_paths(
+        media_root, orphan
+    )
+    with override_settings(MEDIA_RELEASE_GRACE=3600):
+        with django_capture_on_commit_callbacks(execute=True):
+            orphan.delete()
+        call_command("delete_orphan_media", stdout=StringIO())
+    assert all(path.exists() for path in orphan_paths), (
+        "Убедитесь, что недавно сохранённые файлы не удаляются."
+    )
+    out = StringIO()
+    call_command("delete_orphan_media", stdout=out)
+    assert f"{len(orphan_paths)} orphan" in out.getvalue()
+    assert not any(path.exists() for path in orphan_paths)
+    assert all(path.exists() for path in kept_paths)
+
+
+def test_hash_media_files_command(media_root, mixer, user):
+    legacy = FileSystemStorage(location=media_root)
+    name = legacy.save("blog_images/legacy.jpg", ContentFile(
+        _image_file().read()
+    ))
+    rendition = legacy.save("blog_images/legacy.w320.webp", ContentFile(
+        b"webp"
+    ))
+    posts = mixer.cycle(2).blend("blog.Post", author=user, image=None)
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        image=name, image_renditions={
+            "name": name, "sources": {"webp": [[320, rendition]]}
+        }
+    )
+    out = StringIO()
+    call_command("hash_media_files", stdout=out)
+    assert "2 posts" in out.getvalue()
+    moved = Post.objects.get(pk=posts[0].pk)
+    assert is_content_addressed(moved.image.name)
+    assert Post.objects.filter(image=moved.image.name).count() == 2
+    [[width, moved_rendition]] = moved.image_renditions["sources"]["webp"]
+    assert (media_root / moved_rendition).read_bytes() == b"webp"
+    assert (media_root / moved.image.name).exists()
+    assert not (media_root / name).exists()
+    assert not (media_root / rendition).exists()
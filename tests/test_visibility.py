@@ -0,0 +1,49 @@
+import pytest
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import Post
+from blog.visibility import filter_posts
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _or_filter(user, queryset=None):
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        Q(author=user) | Q(
+            pub_date__lte=timezone.now(),
+            is_published=True,
+            category__is_published=True,
+        )
+    )
+
+
+def test_union_matches_or_filter(
+        user, another_user, published_category,
+        many_posts_with_published_locations,
+        posts_with_unpublished_category, future_posts,
+        unpublished_posts_with_published_locations, post_of_another_author
+):
+    for viewer in (user, another_user):
+        for queryset in (None, published_category.posts, user.posts):
+            union = Post.get_published_posts(user=viewer, queryset=queryset)
+            expected = _or_filter(viewer, queryset)
+            union_ids = [post.id for post in union]
+            assert len(union_ids) == len(set(union_ids))
+            assert set(union_ids) == set(
+                expected.values_list("id", flat=True)
+            ), (
+                "Убедитесь, что набор публикаций, видимых пользователю,"
+                " не изменился."
+            )
+            assert union.count() == expected.count()
+
+
+def test_filter_posts_applies_to_every_branch(
+        user, many_posts_with_published_locations, post_of_another_author
+):
+    union = Post.get_published_posts(user=user)
+    filtered = filter_posts(union, author=user)
+    assert {post.author_id for post in filtered} == {user.id}
+    assert filtered.count() == len(many_posts_with_published_locations)
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+from django.db import IntegrityError, OperationalError, connection
+from django.test import override_settings
+
+from blog import writes
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+class FlakyWrite:
+    """A write failing with the given error a number of times."""
+
+    def __init__(self, failures, message="database is locked"):
+        self.failures = failures
+        self.message = message
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OperationalError(self.message)
+        return "done"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(writes.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def outside_transaction(monkeypatch):
+    # The test database wraps every test in a transaction
+    monkeypatch.setattr(connection, "in_atomic_block", False)
+
+
+@override_settings(
+    WRITE_RETRY_ATTEMPTS=5, WRITE_RETRY_BASE_DELAY=0.1,
+    WRITE_RETRY_MAX_DELAY=0.15
+)
+def test_locked_write_is_retried_with_backoff(outside_transaction, sleeps):
+    write = FlakyWrite(failures=3)
+    assert writes.run_write(write) == "done"
+    assert write.calls == 4, (
+        "Убедитесь, что запись повторяется, пока база данных заблокирована."
+    )
+    ceilings = (0.1, 0.15, 0.15)
+    assert all(
+        0 <= delay <= ceiling for delay, ceiling in zip(sleeps, ceilings)
+    )
+
+
+@override_settings(WRITE_RETRY_ATTEMPTS=3)
+def test_retries_are_limited(outside_transaction, sleeps):
+    write = FlakyWrite(failures=10)
+    with pytest.raises(OperationalError):
+        writes.run_write(write)
+    assert write.calls == 3 and len(sleeps) == 2
+
+
+def test_other_errors_are_not_retried(outside_transaction, sleeps):
+    write = FlakyWrite(failures=1, message="no such table: blog_post")
+    with pytest.raises(OperationalError):
+        writes.run_write(write)
+    assert write.calls == 1 and not sleeps
+
+
+def test_no_retry_inside_outer_transaction(sleeps):
+    write = FlakyWrite(failures=1)
+    with pytest.raises(OperationalError):
+        writes.run_write(write)
+    assert write.calls == 1
+
+
+def _new_comments(post, user, count):
+    return [Comment(post=post, author=user, text=f"Комментарий {number}")
+            for number in range(count)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writer_saves_queued_comments_in_one_batch(
+        monkeypatch, user, post_with_published_location
+):
+    post = post_with_published_location
+    writer = writes.CommentWriter(batch_size=50)
+    monkeypatch.setattr(writer, "ensure_started", lambda: None)
+    futures = [
+        writer.submit(comment) for comment in _new_comments(post, user, 20)
+    ]
+    monkeypatch.undo()
+    writer.ensure_started()
+    saved = [future.result(timeout=5) for future in futures]
+    assert all(comment.pk for comment in saved)
+    assert writer.batches == 1, (
+        "Убедитесь, что комментарии из очереди сохраняются одной транзакцией."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == Comment.objects.count() == 20
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalid_comment_does_not_fail_its_batch(
+        monkeypatch, user, post_with_published_location
+):
+    post = post_with_published_location
+    comments = _new_comments(post, user, 5)
+    comments[2].text = None
+    writer = writes.CommentWriter(batch_size=50)
+    monkeypatch.setattr(writer, "ensure_started", lambda: None)
+    futures = [writer.submit(comment) for comment in comments]
+    monkeypatch.undo()
+    writer.ensure_started()
+    with pytest.raises(IntegrityError):
+        futures[2].result(timeout=5)
+    saved = [
+        future.result(timeout=5)
+        for number, future in enumerate(futures) if number != 2
+    ]
+    assert all(comment.pk for comment in saved), (
+        "Убедитесь, что ошибка в одном комментарии не отменяет сохранение"
+        " остальных комментариев пакета."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == Comment.objects.count() == 4
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("use_queue", [False, True])
+def test_concurrent_comment_writes(
+        user, post_with_published_location, use_queue
+):
+    """Stress test: concurrent writers, no write may fail."""
+    post = post_with_published_location
+    n_threads, per_thread = 8, 15
+    errors = []
+
+    def write_comments():
+        try:
+            for comment in _new_comments(post, user, per_thread):
+                try:
+                    writes.save_comment(comment)
+                except OperationalError as error:
+                    errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=write_comments) for _ in range(n_threads)
+    ]
+    with override_settings(
+        COMMENT_WRITE_QUEUE=use_queue, WRITE_RETRY_ATTEMPTS=50,
+        WRITE_RETRY_BASE_DELAY=0.001, WRITE_RETRY_MAX_DELAY=0.05
+    ):
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    total = n_threads * per_thread
+    print(
+        f"\n{'queue' if use_queue else 'retry'}: {total / elapsed:.0f}"
+        f" comments/s, error rate {len(errors) / total:.1%}"
+    )
+    assert not errors, (
+        "Убедитесь, что конкурентные записи комментариев не завершаются"
+        " ошибкой `database is locked`."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == Comment.objects.count() == total